@@ -1,16 +1,29 @@
 from flask import Flask
-from flask import jsonify
+from flask import Response
 from flask_cors import CORS
 from flask_swagger_ui import get_swaggerui_blueprint
 
+from app.api_spec import ApiSpec
+from app.cache import ResponseCache
+from app.compression import Compressor
 from app.config import load_config
 from app.data_source import get_data_source
 from app.data_source import get_data_source, BaseDataSource
 from app.logger import setup_logger
-from app.routes import create_data_blueprint, create_home_blueprint
+from app.routes import create_data_blueprint, create_home_blueprint, create_health_blueprint, DATA_TABLES, \
+    EndpointDirectory
+from app.warm_up import DataWarmUp
 
 
-def create_app(config_file='config/config.yaml'):
+def create_app(config_file='config/config.yaml', preload: bool = False):
+    """
+    Create the Flask app
+
+    :param config_file: path to the config file
+    :param preload: whether to preload the tables before returning regardless of the warm-up config, used by the
+        pre-fork server so that its workers share the loaded tables
+    :return: the created app
+    """
     app = Flask(__name__, template_folder='../templates')
 
     # Load configuration
@@ -22,22 +35,54 @@ def create_app(config_file='config/config.yaml'):
 
     # Initialize data source
     data_source = get_data_source(config)
+    app.extensions['data_source'] = data_source
+
+    # Preload the tables (if enabled), the app only reports as ready after the warm-up is finished
+    warm_up_config = config['data_source']['warm_up']
+    warm_up = DataWarmUp(data_source, DATA_TABLES.values(),
+                         use_processes=warm_up_config['executor'] == 'process',
+                         max_workers=warm_up_config['max_workers'])
+    app.extensions['warm_up'] = warm_up
+
+    # Cache for the serialized responses
+    response_cache_config = config['app']['response_cache']
+    response_cache = ResponseCache(response_cache_config['max_bytes']) if response_cache_config['enabled'] else None
+    app.extensions['response_cache'] = response_cache
+
+    # Compression of the data responses
+    compression_config = config['app']['compression']
+    compressor = None
+    if compression_config['enabled']:
+        compressor = Compressor(compression_config['min_size'], compression_config['gzip_level'],
+                                compression_config['brotli_level'], compression_config['zstd_level'])
+    app.extensions['compressor'] = compressor
 
     # Register the blueprints
-    register_blueprints(app, data_source)
+    register_blueprints(app, data_source, response_cache, compressor)
+    app.register_blueprint(create_health_blueprint(warm_up), url_prefix='/health')
 
     CORS(app)
 
+    if preload:
+        warm_up.start(background=False)
+    elif warm_up_config['enabled']:
+        warm_up.start(background=warm_up_config['background'])
+    else:
+        warm_up.mark_ready()
+
     return app
 
 
-def register_blueprints(app, data_source: BaseDataSource):
+def register_blueprints(app, data_source: BaseDataSource, response_cache: ResponseCache = None,
+                        compressor: Compressor = None):
     api_url = '/api'
     api_spec_url = f'{api_url}/spec'  # Endpoint to serve the API specification
     swagger_url = '/swagger'  # Endpoint to serve the Swagger UI configuration
 
     # Create and register the data blueprint
-    data_bp = create_data_blueprint(data_source)
+    batch_config = app.config['batch']
+    data_bp = create_data_blueprint(data_source, response_cache, compressor, batch_config['max_requests'],
+                                    batch_config['max_workers'])
     app.register_blueprint(data_bp, url_prefix=api_url)
     swagger_ui_blueprint = get_swaggerui_blueprint(
         swagger_url,  # Swagger UI static files will be mapped to {SWAGGER_URL}/
@@ -48,15 +93,17 @@ def register_blueprints(app, data_source: BaseDataSource):
     )
     app.register_blueprint(swagger_ui_blueprint, url_prefix=swagger_url)
 
-    # Create an endpoint to serve the Swagger specification
+    # Create an endpoint to serve the Swagger specification, it's built once and served from memory afterwards
+    api_spec = ApiSpec(app, data_source, DATA_TABLES, api_url, title="Data API", version="1.0")
+    app.extensions['api_spec'] = api_spec
+
     @app.route(api_spec_url)
     def swagger_spec():
-        from flask_swagger import swagger
-        swag = swagger(app)
-        swag['info']['title'] = "Data API"
-        swag['info']['version'] = "1.0"
-        return jsonify(swag)
-
-    # Register and register the home blueprint, should be done at end
-    home_bp = create_home_blueprint(api_url=api_spec_url, swagger_url=swagger_url)
+        return Response(api_spec.get_body(), mimetype='application/json')
+
+    # Register and register the home blueprint, should be done at end since its endpoint directory is computed once
+    # from the registered data endpoints
+    endpoint_directory = EndpointDirectory(app.url_map, api_spec_url, swagger_url)
+    home_bp = create_home_blueprint(api_url=api_spec_url, swagger_url=swagger_url,
+                                    endpoint_directory=endpoint_directory)
     app.register_blueprint(home_bp)
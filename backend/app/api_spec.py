@@ -0,0 +1,108 @@
+import json
+import logging
+import threading
+
+from flask_swagger import swagger
+
+from app.data_source import BaseDataSource, DataLevel, KEY_COLUMN, AGGREGATE_GROUP_COLUMNS, is_year_column
+from app.exceptions import DataSourceException
+
+logger = logging.getLogger(__name__)
+
+
+def get_column_schema(column) -> dict:
+    """
+    Get the schema of a column of the records of the data responses.
+
+    :param column: Name of the column.
+    :return: Swagger schema of the values of the column.
+    """
+    if column == KEY_COLUMN:
+        return {'type': 'integer', 'description': str(column)}
+    if is_year_column(column):
+        return {'type': 'number', 'description': str(column), 'format': 'float'}
+    return {'type': 'string', 'description': str(column)}
+
+
+def get_record_schema(columns) -> dict:
+    """
+    Get the schema of the records of the data responses of a table, the level columns are dropped from the responses.
+
+    :param columns: Columns of the table.
+    :return: Swagger schema of a record.
+    """
+    level_columns = {f'NUTS {level.value}' for level in DataLevel}
+    return {'type': 'object',
+            'properties': {str(column): get_column_schema(column) for column in columns
+                           if column not in level_columns}}
+
+
+class ApiSpec:
+    def __init__(self, app, data_source: BaseDataSource, tables: dict, api_url: str = '/api', title: str = 'Data API',
+                 version: str = '1.0'):
+        """
+        Swagger specification of the API, built on its first request and then served from memory.
+
+        Building the specification parses the YAML docstrings of all the routes, so it's only rebuilt when the version
+        of the data changes, since the schemas of the records are generated from the columns of the tables.
+
+        :param app: Flask app whose routes are documented, all the blueprints must be registered before the first build.
+        :param data_source: Data source to get the columns of the tables from.
+        :param tables: Maps the names of the data resources to the names of their tables.
+        :param api_url: Prefix of the urls of the data resources.
+        :param title: Title of the API.
+        :param version: Version of the API.
+        """
+        self.app = app
+        self.data_source = data_source
+        self.tables = tables
+        self.api_url = api_url
+        self.title = title
+        self.version = version
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def build(self) -> dict:
+        """
+        Build the specification, tables whose columns can't be retrieved keep the generic schema of the docstrings.
+
+        :return: Swagger specification.
+        """
+        spec = swagger(self.app)
+        spec['info']['title'] = self.title
+        spec['info']['version'] = self.version
+
+        for resource_name, table_name in self.tables.items():
+            try:
+                columns = self.data_source.get_columns(table_name)
+            except DataSourceException as e:
+                logger.warning(f"Could not generate the schema of table {table_name}: {e}")
+                continue
+
+            record_schema = get_record_schema(columns)
+            aggregate_schema = get_record_schema(
+                column for column in columns if is_year_column(column) or column in AGGREGATE_GROUP_COLUMNS)
+            base_url = f'{self.api_url}/{resource_name.lower()}'
+            for path, schema in ((f'{base_url}/{{data_level}}', record_schema),
+                                 (f'{base_url}/series/{{keys}}', record_schema),
+                                 (f'{base_url}/{{data_level}}/aggregate', aggregate_schema)):
+                response = spec['paths'].get(path, {}).get('get', {}).get('responses', {}).get('200')
+                if response is not None:
+                    response['schema']['properties']['data']['items'] = schema
+        return spec
+
+    def get_body(self) -> bytes:
+        """
+        Get the serialized specification, builds it if it isn't built yet or the data has changed since it was built.
+
+        :return: Serialized JSON body.
+        """
+        data_version = self.data_source.version
+        cached = self._cached
+        if cached is None or cached[0] != data_version:
+            with self._lock:
+                cached = self._cached
+                if cached is None or cached[0] != data_version:
+                    cached = data_version, json.dumps(self.build()).encode()
+                    self._cached = cached
+        return cached[1]
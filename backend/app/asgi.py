@@ -0,0 +1,113 @@
+import json
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import MultiDict
+
+from app import create_app
+from app.routes import DATA_TABLES, DataRequestOptions, GenericDataResource
+
+
+class AsgiApp:
+    def __init__(self, flask_app, api_url='/api'):
+        """
+        ASGI application that serves the data endpoints natively with the async methods of the data source
+
+        Requests of the data and metadata endpoints are handled on the event loop, so waiting for the data source doesn't
+        hold a thread, all the other requests are passed to the wrapped Flask app.
+
+        :param flask_app: Flask app created by `create_app`
+        :param api_url: URL prefix of the data endpoints
+        """
+        self.flask_app = flask_app
+        self.wsgi_app = WsgiToAsgi(flask_app)
+        self.data_source = flask_app.extensions['data_source']
+        self.response_cache = flask_app.extensions['response_cache']
+        self.compressor = flask_app.extensions['compressor']
+        self.default_payload = flask_app.config.get('data_payload', 'array')
+        self.tables = {f'{api_url}/{resource_name.lower()}': table_name
+                       for resource_name, table_name in DATA_TABLES.items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+            return
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            resource_url, _, data_level = scope['path'].rstrip('/').rpartition('/')
+            table_name = self.tables.get(resource_url)
+            if table_name is not None and data_level:
+                request_headers = {name.lower(): value.decode('latin-1') for name, value in scope['headers']}
+                result = await self.handle_request(table_name, data_level, scope['query_string'],
+                                                   request_headers.get(b'accept-encoding'), request_headers.get(b'accept'))
+                if result is not None:
+                    status, headers, body = result
+                    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+
+        await self.wsgi_app(scope, receive, send)
+
+    async def handle_request(self, table_name, data_level, query_string: bytes, accept_encoding: str = None,
+                             accept: str = None):
+        """
+        Handle a request of a data or metadata endpoint
+
+        :param table_name: name of the table of the requested endpoint
+        :param data_level: requested data level, or 'metadata' for the metadata endpoint
+        :param query_string: raw query string of the request
+        :param accept_encoding: value of the Accept-Encoding header of the request
+        :param accept: value of the Accept header of the request
+        :return: tuple containing the status, the headers and the body of the response, or None if the request has to be
+            handled by the Flask app (i.e. streamed responses)
+        """
+        if data_level == 'metadata':
+            result = await GenericDataResource.ahandle_metadata_request(self.data_source.aget_metadata, table_name)
+        else:
+            args = MultiDict(parse_qsl(query_string.decode('latin-1'), keep_blank_values=True))
+            try:
+                options = DataRequestOptions.from_args(args, self.default_payload, accept)
+            except ValueError as e:
+                result = {'status': 'error', 'message': str(e)}, 400
+            else:
+                if options.stream:
+                    return None
+                # reading the version may check the file or the database, so it's not read on the event loop
+                version = await self.data_source.aget_version()
+                result = await GenericDataResource.ahandle_data_request(
+                    self.data_source.aget_data, table_name, data_level, self.response_cache, version, options,
+                    self.compressor, accept_encoding)
+
+        headers = [(b'access-control-allow-origin', b'*')]
+        if isinstance(result, tuple):
+            body, status = json.dumps(result[0]).encode('utf-8'), result[1]
+            headers.append((b'content-type', b'application/json'))
+        else:
+            body, status = result.get_data(), result.status_code
+            headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in result.headers
+                        if name in ('Content-Type', 'Content-Encoding', 'Vary')]
+        headers.append((b'content-length', str(len(body)).encode('latin-1')))
+        return status, headers, body
+
+    async def handle_lifespan(self, receive, send):
+        """Handle the lifespan events of the ASGI server, releases the connections of the data source on shutdown"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                async_engine = getattr(self.data_source, 'async_engine', None)
+                if async_engine is not None:
+                    await async_engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config_file='config/config.yaml'):
+    """
+    Create the ASGI application, run it with an ASGI server, e.g. `uvicorn asgi:app`
+
+    :param config_file: path to the config file
+    :return: the created ASGI application
+    """
+    return AsgiApp(create_app(config_file))
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int):
+        """
+        Thread-safe LRU cache for serialized responses that is bounded by the total size of the stored bytes.
+
+        :param max_bytes: Maximum total size of the cached values in bytes, least recently used entries are evicted
+            once this size is exceeded.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the cached value of the given key and mark it as recently used.
+
+        :param key: Key of the value, must be hashable.
+        :return: The cached bytes or None if the key is not cached.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value: bytes):
+        """
+        Store the given value in the cache, values larger than the cache itself are not stored.
+
+        :param key: Key of the value, must be hashable.
+        :param value: Bytes to store.
+        """
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous_value = self._entries.pop(key, None)
+            if previous_value is not None:
+                self.size -= len(previous_value)
+
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted_value = self._entries.popitem(last=False)
+                self.size -= len(evicted_value)
+
+    def clear(self):
+        """Remove all the cached values."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
@@ -0,0 +1,56 @@
+import gzip
+
+import brotli
+import zstandard
+from werkzeug.http import parse_accept_header
+
+# Supported content encodings in the order of preference, used when the client accepts several of them equally
+ENCODINGS = ('br', 'zstd', 'gzip')
+
+
+class Compressor:
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_level: int = 5, zstd_level: int = 3):
+        """
+        Compresses response bodies with the content encoding negotiated from the Accept-Encoding header of a request.
+
+        :param min_size: Minimum size of the bodies in bytes that are compressed, smaller bodies are sent as they are.
+        :param gzip_level: Compression level of gzip, from 0 to 9.
+        :param brotli_level: Compression level (quality) of brotli, from 0 to 11.
+        :param zstd_level: Compression level of zstd, from 1 to 22.
+        """
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_level = brotli_level
+        self.zstd_level = zstd_level
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """
+        Select the content encoding of a response.
+
+        :param accept_encoding: Value of the Accept-Encoding header of the request.
+        :return: The preferred supported encoding that is accepted by the client, or None if the response shouldn't be
+            compressed.
+        """
+        if not accept_encoding:
+            return None
+        return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+    def should_compress(self, body: bytes) -> bool:
+        """Whether the given body is large enough to be compressed."""
+        return len(body) >= self.min_size
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """
+        Compress the given body.
+
+        :param body: Body to compress.
+        :param encoding: Content encoding to compress the body with, one of `ENCODINGS`.
+        :return: The compressed body.
+        """
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_level)
+        if encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        if encoding == 'gzip':
+            return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        raise ValueError(f"Unsupported content encoding: {encoding}")
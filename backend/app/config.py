@@ -15,18 +15,96 @@ config_schema = {
             'log_to_file': {'type': 'boolean', 'default': True},
             'log_max_bytes': {'type': 'integer', 'min': 100, 'default': 10000},
             'log_backup_count': {'type': 'integer', 'min': 0, 'default': 1},
+            'data_payload': {'type': 'string', 'allowed': ['array', 'string'], 'default': 'array'},
+            'stream_chunk_size': {'type': 'integer', 'min': 1, 'default': 1000},
+            'response_cache': {
+                'type': 'dict',
+                'schema': {
+                    'enabled': {'type': 'boolean', 'default': True},
+                    'max_bytes': {'type': 'integer', 'min': 0, 'default': 64 * 1024 * 1024},
+                },
+                'default': {}
+            },
+            'batch': {
+                'type': 'dict',
+                'schema': {
+                    'max_requests': {'type': 'integer', 'min': 1, 'default': 100},
+                    'max_workers': {'type': 'integer', 'min': 1, 'nullable': True, 'default': None},
+                },
+                'default': {}
+            },
+            'compression': {
+                'type': 'dict',
+                'schema': {
+                    'enabled': {'type': 'boolean', 'default': True},
+                    'min_size': {'type': 'integer', 'min': 0, 'default': 1024},
+                    'gzip_level': {'type': 'integer', 'min': 0, 'max': 9, 'default': 6},
+                    'brotli_level': {'type': 'integer', 'min': 0, 'max': 11, 'default': 5},
+                    'zstd_level': {'type': 'integer', 'min': 1, 'max': 22, 'default': 3},
+                },
+                'default': {}
+            },
         }
     },
+    'server': {
+        'type': 'dict',
+        'schema': {
+            'bind': {'type': 'string', 'default': '0.0.0.0:5000'},
+            'workers': {'type': 'integer', 'min': 1, 'nullable': True, 'default': None},
+            'threads': {'type': 'integer', 'min': 1, 'default': 1},
+            'timeout': {'type': 'integer', 'min': 0, 'default': 30},
+        },
+        'default': {}
+    },
     'data_source': {
         'type': 'dict',
         'schema': {
             'type': {'type': 'string', 'allowed': ['sqlite', 'excel'], 'default': 'sqlite'},
+            'async_max_workers': {'type': 'integer', 'min': 1, 'nullable': True, 'default': None},
+            'dtypes': {
+                'type': 'dict',
+                'schema': {
+                    'compact': {'type': 'boolean', 'default': True},
+                    'float_type': {'type': 'string', 'allowed': ['float32', 'float64'], 'default': 'float64'},
+                },
+                'default': {}
+            },
             'sqlite': {
                 'type': 'dict',
                 'schema': {
                     'db_path': {'type': 'string', 'default': 'my_database.db'},
                     'create_tables_from_excel': {'type': 'boolean', 'default': False},
                     'excel_file': {'type': 'string', 'default': 'example.xlsx'},
+                    'pool': {
+                        'type': 'dict',
+                        'schema': {
+                            'size': {'type': 'integer', 'min': 1, 'default': 5},
+                            'max_overflow': {'type': 'integer', 'min': 0, 'default': 10},
+                            'pre_ping': {'type': 'boolean', 'default': False},
+                            'recycle': {'type': 'integer', 'min': -1, 'default': -1},
+                        },
+                        'default': {}
+                    },
+                    'read_only': {'type': 'boolean', 'default': False},
+                    'pragmas': {
+                        'type': 'dict',
+                        'schema': {
+                            'journal_mode': {'type': 'string',
+                                             'allowed': ['delete', 'truncate', 'persist', 'memory', 'wal', 'off'],
+                                             'default': 'wal'},
+                            'mmap_size': {'type': 'integer', 'min': 0, 'default': 268435456},
+                            'cache_size': {'type': 'integer', 'default': -65536},
+                        },
+                        'default': {}
+                    },
+                    'import': {
+                        'type': 'dict',
+                        'schema': {
+                            'chunk_size': {'type': 'integer', 'min': 1, 'default': 5000},
+                            'max_workers': {'type': 'integer', 'min': 1, 'nullable': True, 'default': None},
+                        },
+                        'default': {}
+                    },
                 },
                 'required': False
             },
@@ -34,8 +112,20 @@ config_schema = {
                 'type': 'dict',
                 'schema': {
                     'file_name': {'type': 'string', 'default': 'example.xlsx'},
+                    'snapshot_dir': {'type': 'string', 'nullable': True, 'default': None},
+                    'storage': {'type': 'string', 'allowed': ['dataframe', 'columnar'], 'default': 'dataframe'},
                 },
                 'required': False
+            },
+            'warm_up': {
+                'type': 'dict',
+                'schema': {
+                    'enabled': {'type': 'boolean', 'default': False},
+                    'background': {'type': 'boolean', 'default': True},
+                    'executor': {'type': 'string', 'allowed': ['thread', 'process'], 'default': 'thread'},
+                    'max_workers': {'type': 'integer', 'min': 1, 'nullable': True, 'default': None},
+                },
+                'default': {}
             }
         }
     }
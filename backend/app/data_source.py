@@ -1,14 +1,69 @@
 import abc
+import asyncio
 import enum
+import functools
+import hashlib
+import json
+import logging
+import mmap
 import numbers
 import os
+import shutil
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, MetaData, Table, select, Integer, Float, String, Column
+import pyarrow as pa
+from sqlalchemy import create_engine, event, MetaData, Table, select, Integer, Float, String, Column, cast, Index, \
+    func, case
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.exceptions import MetadataNotFoundException, DataNotFoundException, DataSourceException
+from app.exceptions import MetadataNotFoundException, DataNotFoundException, DataSourceException, \
+    InvalidQueryException
+
+logger = logging.getLogger(__name__)
+
+# Stable and unique column that identifies the rows of the tables, used for the keyset pagination
+KEY_COLUMN = 'Lfd. Nr.'
+
+# Columns that the data can be filtered on, values of the prefix filter columns are matched by their prefix
+FILTER_COLUMNS = ('Land', 'EU-Code', 'Regional-schlüssel')
+PREFIX_FILTER_COLUMNS = ('Regional-schlüssel',)
+
+# Number of rows inserted by each executemany call when importing a sheet into a database
+IMPORT_CHUNK_SIZE = 5000
+
+# Number of rows in each chunk of the streamed data
+STREAM_CHUNK_SIZE = 1000
+
+# Columns that identify a region across all the data levels, the time series of the regions can be looked up by them
+SERIES_KEY_COLUMNS = ('EU-Code', 'Regional-schlüssel')
+
+# Operations that can aggregate the year columns, 'growth' is the year-over-year growth rate of the sums
+AGGREGATE_OPERATIONS = ('sum', 'mean', 'min', 'max', 'growth')
+
+# Columns the rows can be grouped by when aggregating, the rows of a data level are aggregated together if not grouped
+AGGREGATE_GROUP_COLUMNS = ('Land',)
+
+# Identifier columns that are stored as categoricals by `to_compact_dtypes` if they have few distinct values
+CATEGORICAL_COLUMNS = ('Land', 'EU-Code', 'Regional-schlüssel')
+
+# Dtypes the year columns can be stored as by `to_compact_dtypes`
+FLOAT_DTYPES = ('float32', 'float64')
+
+# Bookkeeping table of the imported sheets and the suffix of the tables that sheets are imported into before the swap
+IMPORT_STATE_TABLE = 'import_state'
+STAGING_TABLE_SUFFIX = '__staging'
+# Version of the way the sheets are stored in the tables, part of the content hashes so changing it imports all sheets
+IMPORT_FORMAT_VERSION = 2
+
+# Largest possible character, appending it to a prefix gives an upper bound for all the strings starting with the prefix
+_MAX_CHARACTER = '\U0010ffff'
 
 
 class DataLevel(enum.Enum):
@@ -17,20 +72,212 @@ class DataLevel(enum.Enum):
     LEVEL3 = '3'
 
 
+def is_year_column(column) -> bool:
+    """
+    Check whether the given column contains the values of a year, i.e. whether its name is a year.
+
+    :param column: Name of the column, year columns are named by integers (Excel) or digit strings (databases).
+    :return: Whether the column is a year column.
+    """
+    return isinstance(column, numbers.Integral) or (isinstance(column, str) and column.isdigit())
+
+
+def get_level_mask(data: pd.DataFrame, data_level: DataLevel) -> pd.Series:
+    """
+    Select the rows of the given data level.
+
+    :param data: Data of a table, its `NUTS n` columns either contain the number of the level or boolean flags.
+    :param data_level: Data level to select.
+    :return: Boolean mask of the rows of the data level.
+    """
+    values = data[f'NUTS {data_level.value}']
+    if pd.api.types.is_bool_dtype(values):
+        return values
+    return values == data_level.value
+
+
+def to_compact_dtypes(data: pd.DataFrame, float_dtype: str = 'float64') -> pd.DataFrame:
+    """
+    Convert the columns of the data of a table to compact dtypes, the corrected sheets only contain object columns.
+
+    The key column is converted to int64 and the year columns to `float_dtype`, year columns that contain text values
+    (e.g. '.' for the missing values) are kept as they are so the text values are still served. The columns of
+    `CATEGORICAL_COLUMNS` are converted to categoricals if at most half of their values are distinct, otherwise the
+    categories would take more memory than the original values. The `NUTS n` columns are converted to boolean flags of
+    the rows of level n. Converting already converted data doesn't change it.
+
+    :param data: Data of a table.
+    :param float_dtype: Dtype of the year columns, one of `FLOAT_DTYPES`.
+    :return: Converted copy of the data, the columns that aren't converted are shared with the given data.
+    :raises DataSourceException: If the float dtype isn't supported.
+    """
+    if float_dtype not in FLOAT_DTYPES:
+        raise DataSourceException(f"Unknown float dtype: {float_dtype}")
+
+    level_columns = {f'NUTS {level.value}': level for level in DataLevel}
+    data = data.copy(deep=False)
+    for position, (column, values) in enumerate(data.items()):
+        if column == KEY_COLUMN:
+            keys = pd.to_numeric(values, errors='coerce')
+            if keys.notna().all():
+                data.isetitem(position, keys.astype(np.int64))
+        elif is_year_column(column):
+            numeric_values = pd.to_numeric(values, errors='coerce')
+            if numeric_values.count() == values.count():
+                data.isetitem(position, numeric_values.astype(float_dtype))
+        elif column in CATEGORICAL_COLUMNS:
+            if values.nunique() <= len(values) // 2:
+                data.isetitem(position, values.astype('category'))
+        elif column in level_columns:
+            data.isetitem(position, get_level_mask(data, level_columns[column]).astype(bool))
+    return data
+
+
+def validate_aggregation(operation: str, group: str = None):
+    """
+    Check whether the given aggregation is supported.
+
+    :param operation: Aggregate operation, one of `AGGREGATE_OPERATIONS`.
+    :param group: Column to group the rows by, one of `AGGREGATE_GROUP_COLUMNS` or None.
+    :raises InvalidQueryException: If the operation or the group column isn't supported.
+    """
+    if operation not in AGGREGATE_OPERATIONS:
+        raise InvalidQueryException(f"Unknown aggregate operation: {operation}")
+    if group is not None and group not in AGGREGATE_GROUP_COLUMNS:
+        raise InvalidQueryException(f"Grouping by column {group} is not supported")
+
+
+def growth_rates(values: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the year-over-year growth rates of the year columns.
+
+    :param values: Numeric values of consecutive year columns.
+    :return: Growth rates relative to the previous column, null for the first column and where the previous value is
+        missing or zero.
+    """
+    matrix = values.to_numpy(dtype=np.float64)
+    rates = np.full_like(matrix, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates[:, 1:] = matrix[:, 1:] / matrix[:, :-1] - 1
+    rates[~np.isfinite(rates)] = np.nan
+    return pd.DataFrame(rates, index=values.index, columns=values.columns)
+
+
+def aggregate_year_values(values: pd.DataFrame, operation: str, groups: pd.Series = None) -> pd.DataFrame:
+    """
+    Aggregate the year columns with a vectorized (grouped) reduction.
+
+    :param values: Year columns of the rows, values that aren't numbers are ignored.
+    :param operation: Aggregate operation, one of `AGGREGATE_OPERATIONS`.
+    :param groups: Values to group the rows by, aggregates all the rows into a single one if not provided.
+    :return: One row per group (ordered by the group) containing the group column (if grouped) and the aggregated year
+        columns, aggregates without any numeric values are null.
+    """
+    values = values.apply(pd.to_numeric, errors='coerce').astype(np.float64)
+    reduction = 'sum' if operation == 'growth' else operation
+    if groups is None:
+        result = values.sum(min_count=1) if reduction == 'sum' else values.agg(reduction)
+        result = result.to_frame().T.reset_index(drop=True)
+    else:
+        grouped = values.groupby(groups.to_numpy(), sort=True)
+        result = grouped.sum(min_count=1) if reduction == 'sum' else grouped.agg(reduction)
+
+    if operation == 'growth':
+        result = growth_rates(result)
+    if groups is not None:
+        result = result.rename_axis(groups.name).reset_index()
+    return result
+
+
+class Projection:
+    def __init__(self, columns=None, first_year: int = None, last_year: int = None):
+        """
+        Subset of the columns of a table to retrieve, the key column is always retrieved.
+
+        :param columns: Names of the non-year columns to retrieve, retrieves all of them if not provided.
+        :param first_year: First year column to retrieve, starts with the earliest year if not provided.
+        :param last_year: Last year column to retrieve, ends with the latest year if not provided.
+        """
+        self.columns = None if columns is None else tuple(columns)
+        self.first_year = first_year
+        self.last_year = last_year
+
+    def includes_year(self, year: int) -> bool:
+        """
+        Check whether the given year is within the year range of this projection.
+
+        :param year: The year to check.
+        :return: Whether the year should be retrieved.
+        """
+        return ((self.first_year is None or year >= self.first_year)
+                and (self.last_year is None or year <= self.last_year))
+
+    def resolve(self, available_columns) -> list:
+        """
+        Select the columns of this projection from the columns of a table.
+
+        :param available_columns: Columns of the table.
+        :return: The selected columns in the order of the table.
+        :raises InvalidQueryException: If any of the requested columns doesn't exist in the table.
+        """
+        available_columns = list(available_columns)
+        if self.columns is not None:
+            unknown_columns = set(self.columns) - {str(column) for column in available_columns}
+            if unknown_columns:
+                raise InvalidQueryException(f"Unknown columns: {', '.join(sorted(unknown_columns))}")
+
+        selected_columns = []
+        for column in available_columns:
+            if is_year_column(column):
+                if self.includes_year(int(column)):
+                    selected_columns.append(column)
+            elif column == KEY_COLUMN or self.columns is None or str(column) in self.columns:
+                selected_columns.append(column)
+        return selected_columns
+
+    def cache_key(self) -> tuple:
+        """Hashable representation of the projection"""
+        return self.columns, self.first_year, self.last_year
+
+
 class BaseDataSource(abc.ABC):
     def __init__(self):
-        pass
+        # Maximum number of threads running the blocking work of the async methods, uses the executor's default if None
+        self.async_max_workers = None
+        self._async_executor = None
+        self._async_executor_lock = threading.Lock()
+        # Whether the loaded data is converted with `to_compact_dtypes` and the dtype of its year columns
+        self.compact_dtypes = True
+        self.float_dtype = 'float64'
+
+    @property
+    def version(self):
+        """
+        Version of the data served by this data source, changes whenever the underlying data changes.
+
+        :return: Hashable version of the data, or None if changes of the data can't be detected.
+        """
+        return None
 
     @abc.abstractmethod
-    def get_data(self, table_name: str, data_level: DataLevel) -> pd.DataFrame:
+    def get_data(self, table_name: str, data_level: DataLevel, after: int = None, limit: int = None,
+                 projection: Projection = None, filters: dict = None) -> pd.DataFrame:
         """
         Retrieve data from the specified table and data level.
 
+        The rows are ordered by the key column (Lfd. Nr.), which allows paginating through the data by passing the key
+        of the last row of the previous page as `after`.
+
         :param table_name: Name of the table (Excel sheet).
         :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
         :return: DataFrame containing the filtered data.
         :raises DataSourceException: If a general data related error happens.
         :raises DataNotFoundException: If the data could not be found or is empty.
+        :raises InvalidQueryException: If the projection or the filters contain unknown columns.
         """
         raise NotImplementedError
 
@@ -46,18 +293,245 @@ class BaseDataSource(abc.ABC):
         """
         raise NotImplementedError
 
+    def get_columns(self, table_name: str) -> list:
+        """
+        Get the columns of the specified table.
+
+        The default implementation fetches an empty page of the first data level that has any data.
+
+        :param table_name: Name of the table.
+        :return: Names of the columns in the order of the table.
+        :raises DataSourceException: If a general data related error happens.
+        :raises DataNotFoundException: If the table could not be found or is empty.
+        """
+        for data_level in DataLevel:
+            try:
+                return list(self.get_data(table_name, data_level, limit=0).columns)
+            except DataNotFoundException:
+                pass
+        raise DataNotFoundException(f"No data found for table {table_name}.")
+
+    def normalize_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert loaded data to compact dtypes with `to_compact_dtypes`, unless it's disabled.
+
+        :param data: Loaded data of a table.
+        :return: The normalized data.
+        """
+        if not self.compact_dtypes:
+            return data
+        return to_compact_dtypes(data, self.float_dtype)
+
+    def memory_usage(self, table_name: str) -> dict:
+        """
+        Report the memory used by the data of the specified table that is kept in memory.
+
+        The default implementation doesn't keep any data in memory.
+
+        :param table_name: Name of the table.
+        :return: Dictionary containing the number of rows, the total bytes and the dtype and the bytes of each column,
+            or None if the table isn't kept in memory (or not loaded yet).
+        """
+        return None
+
+    @property
+    def async_executor(self) -> ThreadPoolExecutor:
+        """Bounded thread pool that runs the blocking work of the async methods, created on its first usage."""
+        if self._async_executor is None:
+            with self._async_executor_lock:
+                if self._async_executor is None:
+                    self._async_executor = ThreadPoolExecutor(max_workers=self.async_max_workers,
+                                                              thread_name_prefix='data-source')
+        return self._async_executor
+
+    def after_fork(self):
+        """
+        Reset the state that can't be shared with a forked child process, called in every worker of the pre-fork
+        server. The loaded data is kept, so the workers share it with the parent through copy-on-write.
+        """
+        # the threads of the executor don't exist in the child process
+        self._async_executor = None
+        self._async_executor_lock = threading.Lock()
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the async executor, so it doesn't block the event loop.
+
+        :param func: Function to run.
+        :param args: Positional arguments of the function.
+        :param kwargs: Keyword arguments of the function.
+        :return: Return value of the function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.async_executor, functools.partial(func, *args, **kwargs))
+
+    def iter_data(self, table_name: str, data_level: DataLevel, chunk_size: int = STREAM_CHUNK_SIZE, after: int = None,
+                  projection: Projection = None, filters: dict = None):
+        """
+        Retrieve the data of the specified table and data level in chunks, ordered by the key column.
+
+        The first chunk is always yielded, even if it's empty, so the columns of the data are known. The default
+        implementation slices the result of `get_data`.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param chunk_size: Maximum number of rows in each chunk.
+        :param after: Only return the rows whose key is greater than this value.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: Generator of DataFrames containing the consecutive chunks of the filtered data.
+        :raises DataSourceException: If a general data related error happens.
+        :raises DataNotFoundException: If the data could not be found or is empty.
+        :raises InvalidQueryException: If the projection or the filters contain unknown columns.
+        """
+        data = self.get_data(table_name, data_level, after=after, projection=projection, filters=filters)
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+
+    def get_series(self, table_name: str, keys, key_column: str = 'EU-Code', first_year: int = None,
+                   last_year: int = None) -> pd.DataFrame:
+        """
+        Retrieve the rows of the given regions, regardless of their data level.
+
+        The default implementation scans the data of every data level.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param keys: Values of the key column of the regions.
+        :param key_column: Column that identifies the regions, one of `SERIES_KEY_COLUMNS`.
+        :param first_year: First year column to retrieve, starts with the earliest year if not provided.
+        :param last_year: Last year column to retrieve, ends with the latest year if not provided.
+        :return: DataFrame containing a row for each of the found regions in the order of the keys, unknown keys are
+            skipped.
+        :raises DataSourceException: If a general data related error happens.
+        :raises DataNotFoundException: If the data could not be found.
+        :raises InvalidQueryException: If the key column isn't supported.
+        """
+        if key_column not in SERIES_KEY_COLUMNS:
+            raise InvalidQueryException(f"Looking up regions by column {key_column} is not supported")
+
+        projection = Projection(None, first_year, last_year)
+        data = []
+        for data_level in DataLevel:
+            try:
+                data.append(self.get_data(table_name, data_level, projection=projection))
+            except DataNotFoundException:
+                pass
+        if not data:
+            raise DataNotFoundException(f"No data found for table {table_name}.")
+
+        data = pd.concat(data, ignore_index=True).drop_duplicates(key_column).set_index(key_column, drop=False)
+        return data.loc[[key for key in dict.fromkeys(keys) if key in data.index]].reset_index(drop=True)
+
+    def aggregate(self, table_name: str, data_level: DataLevel, operation: str, group: str = None,
+                  first_year: int = None, last_year: int = None, filters: dict = None) -> pd.DataFrame:
+        """
+        Aggregate the year columns of the specified table and data level.
+
+        The default implementation aggregates the columns returned by `get_data` with `aggregate_year_values`.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param operation: Aggregate operation, one of `AGGREGATE_OPERATIONS`.
+        :param group: Column to group the rows by, one of `AGGREGATE_GROUP_COLUMNS`, aggregates all the rows if None.
+        :param first_year: First year column to aggregate, starts with the earliest year if not provided.
+        :param last_year: Last year column to aggregate, ends with the latest year if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: DataFrame containing one row per group (ordered by the group) with the group column (if grouped) and
+            the aggregated year columns.
+        :raises DataSourceException: If a general data related error happens.
+        :raises DataNotFoundException: If the data could not be found or is empty.
+        :raises InvalidQueryException: If the aggregation or the filters aren't supported.
+        """
+        validate_aggregation(operation, group)
+        data = self.get_data(table_name, data_level, filters=filters,
+                             projection=Projection([] if group is None else [group], first_year, last_year))
+        year_columns = [column for column in data.columns if is_year_column(column)]
+        return aggregate_year_values(data[year_columns], operation, None if group is None else data[group])
+
+    async def aget_data(self, table_name: str, data_level: DataLevel, after: int = None, limit: int = None,
+                        projection: Projection = None, filters: dict = None) -> pd.DataFrame:
+        """
+        Async counterpart of `get_data`, the default implementation runs `get_data` in the async executor.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: DataFrame containing the filtered data.
+        :raises DataSourceException: If a general data related error happens.
+        :raises DataNotFoundException: If the data could not be found or is empty.
+        :raises InvalidQueryException: If the projection or the filters contain unknown columns.
+        """
+        return await self.run_blocking(self.get_data, table_name, data_level, after=after, limit=limit,
+                                       projection=projection, filters=filters)
+
+    async def aget_version(self):
+        """
+        Async counterpart of `version`, runs it in the async executor since it may check the underlying data (e.g. the
+        file on disk or the database schema).
+
+        :return: Hashable version of the data, or None if changes of the data can't be detected.
+        """
+        return await self.run_blocking(getattr, self, 'version')
+
+    async def aget_metadata(self, table_name: str) -> pd.DataFrame:
+        """
+        Async counterpart of `get_metadata`, the default implementation runs `get_metadata` in the async executor.
+
+        :param table_name: Name of the table
+        :return: DataFrame containing the metadata.
+        :raises DataSourceException: If a general data related error happens.
+        :raises MetadataNotFoundException: If the metadata could not be found or is empty.
+        """
+        return await self.run_blocking(self.get_metadata, table_name)
+
+    def preload_table(self, table_name: str):
+        """
+        Load the specified table ahead of time so that the following requests don't pay for the initial loading.
+
+        The default implementation simply requests the data of every data level once, data levels without any data
+        are ignored.
+
+        :param table_name: Name of the table to preload.
+        :raises DataSourceException: If a general data related error happens.
+        """
+        for data_level in DataLevel:
+            try:
+                self.get_data(table_name, data_level)
+            except DataNotFoundException:
+                pass
+
+    def preload(self, table_names, use_processes: bool = False, max_workers: int = None):
+        """
+        Preload all the specified tables in parallel.
+
+        :param table_names: Names of the tables to preload.
+        :param use_processes: Whether to use a process pool instead of a thread pool (if supported by the data source).
+        :param max_workers: Maximum number of the parallel workers, uses the executor's default if not provided.
+        :raises DataSourceException: If a general data related error happens.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(self.preload_table, table_names))
+
 
 class FileDataSource(BaseDataSource):
     def __init__(self):
         super().__init__()
 
     @abc.abstractmethod
-    def get_data(self, table_name: str, data_level: DataLevel) -> pd.DataFrame:
+    def get_data(self, table_name: str, data_level: DataLevel, after: int = None, limit: int = None,
+                 projection: Projection = None, filters: dict = None) -> pd.DataFrame:
         """
         Retrieve data from the specified table and data level.
 
         :param table_name: Name of the table (Excel sheet).
         :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
         :return: DataFrame containing the filtered data.
         :raises DataNotFoundException: If the data could not be found or is empty.
         """
@@ -75,39 +549,770 @@ class FileDataSource(BaseDataSource):
         raise NotImplementedError
 
 
+def _build_hash_index(values: pd.Series) -> dict:
+    """
+    Build a hash index over the string representations of the given values.
+
+    :param values: Values to index, missing values are not indexed.
+    :return: Dictionary mapping each value to the ascending positions of the rows that have this value.
+    """
+    index = {}
+    positions = np.flatnonzero(values.notna().to_numpy())
+    for value, position in zip(values.to_numpy()[positions].astype(str), positions):
+        index.setdefault(value, []).append(position)
+    return {value: np.array(value_positions, dtype=np.intp) for value, value_positions in index.items()}
+
+
+class _SortedIndex:
+    def __init__(self, values: pd.Series):
+        """
+        Sorted index over the string representations of the given values, allows prefix lookups in O(log n).
+
+        :param values: Values to index, missing values are not indexed.
+        """
+        positions = np.flatnonzero(values.notna().to_numpy())
+        strings = values.to_numpy()[positions].astype(str)
+        order = np.argsort(strings, kind='stable')
+        self.values = strings[order]
+        self.positions = positions[order]
+
+    def lookup_prefix(self, prefix: str) -> np.ndarray:
+        """
+        Find the rows whose value starts with the given prefix.
+
+        :param prefix: Prefix of the values.
+        :return: Ascending positions of the matching rows.
+        """
+        start = np.searchsorted(self.values, prefix, side='left')
+        end = np.searchsorted(self.values, prefix + _MAX_CHARACTER, side='right')
+        return np.sort(self.positions[start:end])
+
+
+class _CachedTable:
+    def __init__(self, data: pd.DataFrame):
+        """
+        Corrected data of a table split by its data levels, each partition is sorted by its key column.
+
+        The filter columns of each partition are indexed, using a hash index for exact matches and a sorted index for
+        prefix matches. The series key columns are indexed across the partitions, they map each region to its data
+        level and its position in the partition.
+
+        :param data: Corrected data of the table.
+        """
+        self.columns = list(data.columns)
+        self.partitions = {}
+        self.keys = {}
+        self.indexes = {}
+        self.series_indexes = {column: {} for column in SERIES_KEY_COLUMNS if column in data.columns}
+        for level in DataLevel:
+            partition = data[get_level_mask(data, level)]
+            keys = partition[KEY_COLUMN].to_numpy(dtype=np.int64)
+            if not np.all(keys[:-1] < keys[1:]):
+                order = np.argsort(keys, kind='stable')
+                partition, keys = partition.iloc[order], keys[order]
+            self.keys[level] = keys
+            self.indexes[level] = {
+                column: _SortedIndex(partition[column]) if column in PREFIX_FILTER_COLUMNS
+                else _build_hash_index(partition[column])
+                for column in FILTER_COLUMNS if column in partition.columns
+            }
+            for column, series_index in self.series_indexes.items():
+                for position, value in enumerate(partition[column].to_numpy()):
+                    if isinstance(value, str):
+                        series_index.setdefault(value, (level, position))
+            self._store_partition(level, partition)
+
+    def _store_partition(self, data_level: DataLevel, partition: pd.DataFrame):
+        """
+        Store the sorted partition of the given level.
+
+        :param data_level: Data level of the partition.
+        :param partition: Rows of the data level, sorted by their key.
+        """
+        self.partitions[data_level] = partition
+
+    def _take(self, data_level: DataLevel, rows, columns: list = None) -> pd.DataFrame:
+        """
+        Materialize the given rows and columns of a partition.
+
+        :param data_level: Data level of the partition.
+        :param rows: Slice or ascending positions of the rows, takes all the rows if None.
+        :param columns: Columns to take, takes all the columns if not provided.
+        :return: DataFrame containing the rows.
+        """
+        data = self.partitions[data_level]
+        if rows is not None:
+            data = data.iloc[rows]
+        return data if columns is None else data[columns]
+
+    def _column_memory_usage(self, data_level: DataLevel) -> dict:
+        """
+        Get the memory used by the columns of a partition.
+
+        :param data_level: Data level of the partition.
+        :return: Dictionary mapping each column to a tuple containing its dtype and its size in bytes.
+        """
+        usage = {}
+        for column, values in self.partitions[data_level].items():
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # the categories are shared by the partitions, see `_shared_memory_usage`
+                usage[column] = (str(values.dtype), values.cat.codes.nbytes)
+            else:
+                usage[column] = (str(values.dtype), int(values.memory_usage(index=False, deep=True)))
+        return usage
+
+    def _shared_memory_usage(self) -> dict:
+        """
+        Get the memory used by the parts of the columns that are shared by all the partitions.
+
+        :return: Dictionary mapping the columns to their shared size in bytes.
+        """
+        return {column: int(values.cat.categories.memory_usage(deep=True))
+                for column, values in self.partitions[DataLevel.LEVEL1].items()
+                if isinstance(values.dtype, pd.CategoricalDtype)}
+
+    def memory_usage(self) -> dict:
+        """
+        Report the memory used by the values of the columns of all the partitions, the indexes aren't included.
+
+        :return: Dictionary containing the number of rows, the total bytes and the dtype and the bytes of each column.
+        """
+        columns = {str(column): {'dtype': None, 'bytes': 0} for column in self.columns}
+        for column, nbytes in self._shared_memory_usage().items():
+            columns[str(column)]['bytes'] += nbytes
+        for level in DataLevel:
+            for column, (dtype, nbytes) in self._column_memory_usage(level).items():
+                columns[str(column)]['dtype'] = dtype
+                columns[str(column)]['bytes'] += nbytes
+        return {'rows': sum(len(keys) for keys in self.keys.values()),
+                'bytes': sum(column['bytes'] for column in columns.values()), 'columns': columns}
+
+    def is_empty(self, data_level: DataLevel) -> bool:
+        """Whether the given data level doesn't have any rows."""
+        return len(self.keys[data_level]) == 0
+
+    def _filter_positions(self, data_level: DataLevel, filters: dict) -> np.ndarray:
+        """
+        Find the rows of the given level that match all the filters using the indexes.
+
+        :param data_level: Data level of the data.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: Ascending positions of the matching rows.
+        :raises InvalidQueryException: If any of the filter columns isn't indexed.
+        """
+        positions = None
+        for column, value in filters.items():
+            index = self.indexes[data_level].get(column)
+            if index is None:
+                raise InvalidQueryException(f"Filtering on column {column} is not supported")
+
+            if column in PREFIX_FILTER_COLUMNS:
+                matches = index.lookup_prefix(value)
+            else:
+                matches = index.get(value, np.empty(0, dtype=np.intp))
+            positions = matches if positions is None else np.intersect1d(positions, matches, assume_unique=True)
+        return positions
+
+    def get_rows(self, key_column: str, keys, columns: list = None) -> pd.DataFrame:
+        """
+        Get the rows of the given regions with the series index, so each region is found in constant time.
+
+        :param key_column: Column that identifies the regions, one of `SERIES_KEY_COLUMNS`.
+        :param keys: Values of the key column of the regions.
+        :param columns: Columns to return, returns all the columns if not provided.
+        :return: DataFrame containing a row for each of the found regions in the order of the keys, unknown keys are
+            skipped.
+        :raises InvalidQueryException: If the key column isn't indexed.
+        """
+        series_index = self.series_indexes.get(key_column)
+        if series_index is None:
+            raise InvalidQueryException(f"Looking up regions by column {key_column} is not supported")
+
+        locations = list(dict.fromkeys(location for location in map(series_index.get, keys) if location is not None))
+        parts, rows = [], {}
+        for level in DataLevel:
+            positions = sorted(position for location_level, position in locations if location_level == level)
+            if positions:
+                for position in positions:
+                    rows[(level, position)] = len(rows)
+                parts.append(self._take(level, np.array(positions, dtype=np.intp), columns))
+        if not parts:
+            return self._take(DataLevel.LEVEL1, np.empty(0, dtype=np.intp), columns)
+
+        data = pd.concat(parts, ignore_index=True)
+        return data.iloc[[rows[location] for location in locations]].reset_index(drop=True)
+
+    def get_page(self, data_level: DataLevel, after: int = None, limit: int = None, filters: dict = None,
+                 columns: list = None) -> pd.DataFrame:
+        """
+        Get a page of the data of the given level, only slices the cached data so its cost only depends on the page size.
+
+        :param data_level: Data level of the data.
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :param columns: Columns to return, returns all the columns if not provided.
+        :return: DataFrame containing the page.
+        :raises InvalidQueryException: If any of the filter columns isn't indexed.
+        """
+        keys = self.keys[data_level]
+        if filters:
+            positions = self._filter_positions(data_level, filters)
+            if after is not None:
+                positions = positions[np.searchsorted(keys[positions], after, side='right'):]
+            return self._take(data_level, positions[:limit], columns)
+
+        if after is None and limit is None:
+            return self._take(data_level, None, columns)
+
+        start = 0 if after is None else int(np.searchsorted(keys, after, side='right'))
+        end = None if limit is None else start + limit
+        return self._take(data_level, slice(start, end), columns)
+
+
+def _to_shared_array(values: np.ndarray) -> np.ndarray:
+    """
+    Copy the given array into anonymous shared memory and make it read-only.
+
+    The memory is mapped with MAP_SHARED, so processes forked after the copy access the same physical pages instead of
+    copying them on write, and no process can modify them.
+
+    :param values: Array to copy.
+    :return: Read-only copy of the array backed by shared memory.
+    """
+    values = np.ascontiguousarray(values)
+    if values.nbytes == 0:
+        array = values.copy()
+    else:
+        array = np.frombuffer(mmap.mmap(-1, values.nbytes), dtype=values.dtype, count=values.size)
+        array = array.reshape(values.shape)
+        array[...] = values
+    array.flags.writeable = False
+    return array
+
+
+class _ColumnarPartition:
+    def __init__(self, partition: pd.DataFrame):
+        """
+        Columnar encoding of a partition, the arrays are stored in shared memory.
+
+        The year columns are stored as a single float matrix (float32 if all the numeric year columns are float32,
+        float64 otherwise), their values that aren't numbers (e.g. '.' for the missing values) are kept separately so
+        the materialized data is identical to the original one. All the other
+        columns except the key column are dictionary encoded, i.e. stored as the smallest possible integer codes into
+        an array of their distinct values.
+
+        :param partition: Rows of a data level, sorted by their key.
+        """
+        self.year_columns = {column: position for position, column in
+                             enumerate(column for column in partition.columns if is_year_column(column))}
+        year_dtypes = [dtype for dtype in partition[list(self.year_columns)].dtypes if dtype.kind == 'f']
+        years_dtype = np.float32 if year_dtypes and all(dtype == np.float32 for dtype in year_dtypes) else np.float64
+        numeric_years = partition[list(self.year_columns)].apply(pd.to_numeric, errors='coerce')
+        self.years = _to_shared_array(numeric_years.to_numpy(dtype=years_dtype))
+
+        self.text_values = {}
+        for column in self.year_columns:
+            rows = np.flatnonzero(partition[column].notna().to_numpy() & numeric_years[column].isna().to_numpy())
+            if len(rows):
+                self.text_values[column] = (rows, partition[column].to_numpy()[rows])
+
+        self.encoded_columns = {}
+        for column in partition.columns:
+            if column == KEY_COLUMN or column in self.year_columns:
+                continue
+            codes, uniques = pd.factorize(partition[column])
+            # the missing values have the code -1, which points to the NaN appended to the distinct values
+            values = np.append(np.asarray(uniques, dtype=object), np.nan)
+            self.encoded_columns[column] = (
+                _to_shared_array(codes.astype(np.min_scalar_type(-len(values)))), values)
+
+    def memory_usage(self) -> dict:
+        """
+        Get the memory used by the encoded columns, the key column is stored by the table.
+
+        :return: Dictionary mapping each column to a tuple containing its dtype and its size in bytes.
+        """
+        usage = {}
+        for column, position in self.year_columns.items():
+            nbytes = self.years[:, position].nbytes
+            if column in self.text_values:
+                text_rows, text_values = self.text_values[column]
+                nbytes += text_rows.nbytes + int(pd.Series(text_values).memory_usage(index=False, deep=True))
+            usage[column] = (str(self.years.dtype), nbytes)
+        for column, (codes, values) in self.encoded_columns.items():
+            usage[column] = (f'dictionary<{codes.dtype}>',
+                             codes.nbytes + int(pd.Series(values).memory_usage(index=False, deep=True)))
+        return usage
+
+    def take(self, keys: np.ndarray, rows, columns: list) -> pd.DataFrame:
+        """
+        Decode the given rows and columns.
+
+        :param keys: Keys of the partition.
+        :param rows: Slice or ascending positions of the rows.
+        :param columns: Columns to decode.
+        :return: DataFrame containing the decoded rows.
+        """
+        positions = np.arange(len(keys))[rows]
+        data = {}
+        for column in columns:
+            if column == KEY_COLUMN:
+                data[column] = keys[rows]
+            elif column in self.year_columns:
+                values = self.years[rows, self.year_columns[column]]
+                if column in self.text_values:
+                    text_rows, text_values = self.text_values[column]
+                    matches = np.searchsorted(positions, text_rows)
+                    found = matches < len(positions)
+                    found[found] = positions[matches[found]] == text_rows[found]
+                    if found.any():
+                        values = values.astype(object)
+                        values[matches[found]] = text_values[found]
+                data[column] = values
+            else:
+                codes, values = self.encoded_columns[column]
+                data[column] = values[codes[rows]]
+        return pd.DataFrame(data, columns=columns)
+
+
+class _ColumnarCachedTable(_CachedTable):
+    """Cached table that stores its partitions in the columnar encoding of `_ColumnarPartition`."""
+
+    def _store_partition(self, data_level: DataLevel, partition: pd.DataFrame):
+        self.keys[data_level] = _to_shared_array(self.keys[data_level])
+        self.partitions[data_level] = _ColumnarPartition(partition)
+
+    def _take(self, data_level: DataLevel, rows, columns: list = None) -> pd.DataFrame:
+        return self.partitions[data_level].take(self.keys[data_level], slice(None) if rows is None else rows,
+                                                self.columns if columns is None else columns)
+
+    def _column_memory_usage(self, data_level: DataLevel) -> dict:
+        usage = self.partitions[data_level].memory_usage()
+        usage[KEY_COLUMN] = (str(self.keys[data_level].dtype), self.keys[data_level].nbytes)
+        return usage
+
+    def _shared_memory_usage(self) -> dict:
+        return {}
+
+
 class ExcelDataSource(FileDataSource):
     metadata_rows = 3  # Number based on your actual metadata row count
 
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, snapshot_dir: str = None, storage: str = 'dataframe'):
         """
         Initialize the ExcelDataSource.
 
+        Parsed sheets are cached in memory already split into their NUTS level partitions, the cache is dropped
+        whenever the modification time or the size of the Excel file changes.
+
+        If a snapshot directory is given, each corrected sheet and its metadata are also stored there as an Arrow IPC
+        file keyed by the content hash of the Excel file, so that later startups can memory-map the snapshot instead of
+        parsing the Excel file again. Snapshots of older versions of the Excel file are removed automatically.
+
+        The loaded sheets are converted to compact dtypes (see `BaseDataSource.normalize_data`) before they are cached.
+
+        With the 'columnar' storage, the partitions are not kept as DataFrames. Their year columns are stored as a numeric
+        matrix and their other columns as dictionary encoded integer codes, all in shared memory, so that the workers of
+        the pre-fork server read the same physical pages instead of gradually copying them.
+
         :param file_name: Path to the Excel file.
+        :param snapshot_dir: Directory to store the columnar snapshots in, snapshots are disabled if not provided.
+        :param storage: How the parsed sheets are stored in memory, either 'dataframe' or 'columnar'.
         """
         super().__init__()
+        if storage not in ('dataframe', 'columnar'):
+            raise DataSourceException(f"Unknown storage: {storage}")
         self.file_name = file_name
-        self.data = pd.ExcelFile(self.file_name)
+        self.snapshot_dir = snapshot_dir
+        self.storage = storage
+        self.content_hash = None
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._metadata = {}
+        self._file_signature = None
+        self._excel_file = None
+        self._refresh_if_changed()
+
+    @property
+    def version(self):
+        """
+        Version of the data served by this data source, changes whenever the Excel file changes.
+
+        :return: Tuple containing the modification time and the size of the Excel file.
+        """
+        self._refresh_if_changed()
+        return self._file_signature
+
+    @property
+    def data(self) -> pd.ExcelFile:
+        """Excel file of this data source, only opened once it is needed since tables may be read from snapshots."""
+        if self._excel_file is None:
+            with self._lock:
+                if self._excel_file is None:
+                    self._excel_file = pd.ExcelFile(self.file_name)
+        return self._excel_file
+
+    def after_fork(self):
+        """
+        Reset the state that can't be shared with a forked child process, the child reopens the Excel file on its own
+        since the position of the shared file handle would be changed by both processes.
+        """
+        super().after_fork()
+        self._lock = threading.RLock()
+        self._excel_file = None
+
+    def _get_file_signature(self):
+        """
+        Get a cheap signature of the Excel file that changes whenever the file gets replaced or modified
+
+        :return: Tuple containing the modification time and the size of the file.
+        """
+        stat = os.stat(self.file_name)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh_if_changed(self):
+        """
+        Reopen the Excel file and drop all the cached sheets if the file has changed since it was last opened
+        """
+        signature = self._get_file_signature()
+        if signature == self._file_signature:
+            return
+
+        with self._lock:
+            if signature != self._file_signature:
+                self._excel_file = None
+                self._tables = {}
+                self._metadata = {}
+                if self.snapshot_dir:
+                    self.content_hash = self._compute_content_hash()
+                    self._remove_stale_snapshots()
+                self._file_signature = signature
+
+    def _compute_content_hash(self) -> str:
+        """
+        Compute the SHA-256 hash of the content of the Excel file.
+
+        :return: Hex digest of the hash.
+        """
+        file_hash = hashlib.sha256()
+        with open(self.file_name, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def _get_snapshot_directory(self) -> str:
+        """
+        Get the directory containing the snapshots for the current content of the Excel file.
+
+        :return: Path to the snapshot directory.
+        """
+        base_name = os.path.splitext(os.path.basename(self.file_name))[0]
+        return os.path.join(self.snapshot_dir, f'{base_name}-{self.content_hash[:16]}')
+
+    def _get_snapshot_path(self, table_name: str) -> str:
+        """
+        Get the path of the snapshot of the specified table for the current content of the Excel file.
+
+        :param table_name: Name of the table (Excel sheet).
+        :return: Path to the snapshot file.
+        """
+        return os.path.join(self._get_snapshot_directory(), f'{table_name}.arrow')
 
-    def get_data(self, table_name: str, data_level: DataLevel) -> pd.DataFrame:
+    def _remove_stale_snapshots(self):
+        """
+        Remove the snapshots of the older versions of the Excel file.
+        """
+        if not os.path.isdir(self.snapshot_dir):
+            return
+
+        base_name = os.path.splitext(os.path.basename(self.file_name))[0]
+        current_directory = os.path.basename(self._get_snapshot_directory())
+        for directory in os.listdir(self.snapshot_dir):
+            if directory.startswith(f'{base_name}-') and directory != current_directory:
+                shutil.rmtree(os.path.join(self.snapshot_dir, directory), ignore_errors=True)
+
+    def _read_snapshot(self, table_name: str, metadata_only: bool = False):
+        """
+        Read the snapshot of the specified table if it exists.
+
+        The snapshot is memory-mapped, so numeric columns are not copied while reading it.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param metadata_only: Whether to only read the metadata of the table, which is stored in the snapshot's schema.
+        :return: Corrected data (or metadata) of the table, or None if there is no snapshot.
+        """
+        if not self.snapshot_dir:
+            return None
+
+        snapshot_path = self._get_snapshot_path(table_name)
+        if not os.path.exists(snapshot_path):
+            return None
+
+        try:
+            with pa.memory_map(snapshot_path) as source:
+                reader = pa.ipc.open_file(source)
+                schema_metadata = reader.schema.metadata
+                if metadata_only:
+                    return pd.Series(json.loads(schema_metadata[b'metadata']), dtype=str)
+                table = reader.read_all()
+
+            columns = json.loads(schema_metadata[b'columns'])
+            text_columns = json.loads(schema_metadata[b'text_columns'])
+            data = table.to_pandas(split_blocks=True, integer_object_nulls=True)
+
+            index = data.pop('__index__').to_numpy()
+            texts = [data.pop(f'__text_{column_position}__').to_numpy() for column_position in text_columns]
+            data.columns = columns
+            data.index = pd.Index(index)
+            for column_position, text in zip(text_columns, texts):
+                values = data.iloc[:, column_position].to_numpy(dtype=object, copy=True)
+                values[pd.notna(text)] = text[pd.notna(text)]
+                data.isetitem(column_position, values)
+            return data
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot of table {table_name}: {e}")
+            return None
+
+    def _write_snapshot(self, table_name: str, data: pd.DataFrame, metadata: pd.Series):
+        """
+        Store the corrected data and the metadata of the specified table as a snapshot.
+
+        Arrow columns must have a single type, so the text values of columns that mix numbers and text are stored in a
+        separate text column and merged back while reading the snapshot.
+        Failing to write the snapshot is not considered an error since it only slows down the next startup.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param data: Corrected data of the table.
+        :param metadata: Metadata of the table.
+        """
+        if not self.snapshot_dir:
+            return
+
+        snapshot_path = self._get_snapshot_path(table_name)
+        try:
+            arrays = [pa.array(data.index)]
+            text_arrays = []
+            text_columns = []
+            for column_position, (_, values) in enumerate(data.items()):
+                try:
+                    arrays.append(pa.array(values, from_pandas=True))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    is_text = values.map(lambda value: isinstance(value, str))
+                    arrays.append(pa.array(values.where(~is_text), from_pandas=True))
+                    text_arrays.append(pa.array(values.where(is_text), type=pa.string(), from_pandas=True))
+                    text_columns.append(column_position)
+
+            names = (['__index__'] + [str(column) for column in data.columns]
+                     + [f'__text_{column_position}__' for column_position in text_columns])
+            table = pa.Table.from_arrays(arrays + text_arrays, names=names,
+                                         metadata={'columns': json.dumps(list(data.columns)),
+                                                   'text_columns': json.dumps(text_columns),
+                                                   'metadata': json.dumps(list(metadata))})
+
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+            temporary_path = f'{snapshot_path}.{os.getpid()}.tmp'
+            with pa.OSFile(temporary_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(temporary_path, snapshot_path)
+        except Exception as e:
+            logger.warning(f"Could not write the snapshot of table {table_name}: {e}")
+
+    def _get_table(self, table_name: str) -> _CachedTable:
+        """
+        Get the cached data of the given table split by its data levels, parse the sheet if it's not cached yet.
+
+        :param table_name: Name of the table (Excel sheet).
+        :return: Cached data of the table.
+        """
+        self._refresh_if_changed()
+        table = self._tables.get(table_name)
+        if table is not None:
+            return table
+
+        with self._lock:
+            table = self._tables.get(table_name)
+            if table is None:
+                table = self._store_table(table_name, self._load_table(table_name))
+            return table
+
+    def _load_table(self, table_name: str) -> pd.DataFrame:
+        """
+        Load the corrected data of the given table, either from its snapshot or by parsing the Excel sheet.
+
+        :param table_name: Name of the table (Excel sheet).
+        :return: Corrected data of the table.
+        """
+        data = self._read_snapshot(table_name)
+        if data is not None:
+            return data
+
+        data = self.get_corrected_data(self.data.parse(table_name))
+        if self.snapshot_dir:
+            self._write_snapshot(table_name, data, self._get_metadata(table_name))
+        return data
+
+    def _store_table(self, table_name: str, data: pd.DataFrame) -> _CachedTable:
+        """
+        Split the corrected data of the given table by its data levels and store it in the cache.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param data: Corrected data of the table, it's normalized before it's split.
+        :return: Cached data of the table.
+        """
+        data = self.normalize_data(data)
+        table = _ColumnarCachedTable(data) if self.storage == 'columnar' else _CachedTable(data)
+        self._tables[table_name] = table
+        return table
+
+    def preload_table(self, table_name: str):
+        """
+        Parse and cache the specified sheet and its metadata ahead of time.
+
+        :param table_name: Name of the table (Excel sheet).
+        :raises DataNotFoundException: If the sheet could not be parsed.
+        """
+        try:
+            self._get_table(table_name)
+            self._get_metadata(table_name)
+        except Exception as e:
+            raise DataNotFoundException(f"Error preloading table {table_name}: {e}")
+
+    def preload(self, table_names, use_processes: bool = False, max_workers: int = None):
+        """
+        Preload all the specified sheets in parallel.
+
+        Parsing Excel sheets is CPU bound, so using a process pool allows parsing the sheets truly in parallel, in this
+        case the sheets are parsed by the worker processes and the results are cached in this process.
+
+        :param table_names: Names of the tables (Excel sheets) to preload.
+        :param use_processes: Whether to use a process pool instead of a thread pool.
+        :param max_workers: Maximum number of the parallel workers, uses the executor's default if not provided.
+        :raises DataNotFoundException: If a sheet could not be parsed.
+        """
+        if not use_processes:
+            return super().preload(table_names, use_processes, max_workers)
+
+        self._refresh_if_changed()
+        table_names = [table_name for table_name in table_names if table_name not in self._tables]
+
+        # tables with a snapshot are cheap to load, only parse the remaining tables in the worker processes
+        for table_name in table_names:
+            data = self._read_snapshot(table_name)
+            if data is not None:
+                with self._lock:
+                    self._store_table(table_name, data)
+        table_names = [table_name for table_name in table_names if table_name not in self._tables]
+        if not table_names:
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {table_name: executor.submit(_parse_excel_sheet, self.file_name, table_name)
+                       for table_name in table_names}
+            for table_name, future in futures.items():
+                try:
+                    data = future.result()
+                except Exception as e:
+                    raise DataNotFoundException(f"Error preloading table {table_name}: {e}")
+                with self._lock:
+                    self._store_table(table_name, data)
+                if self.snapshot_dir:
+                    self._write_snapshot(table_name, data, self._get_metadata(table_name))
+
+    def get_data(self, table_name: str, data_level: DataLevel, after: int = None, limit: int = None,
+                 projection: Projection = None, filters: dict = None) -> pd.DataFrame:
         """
         Retrieve data from the specified table and data level.
 
+        The returned DataFrame is shared with the cache and should not be modified in-place. The data is paginated
+        before applying the projection, so only the selected columns of the selected rows are materialized.
+
         :param table_name: Name of the table (Excel sheet).
         :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
         :return: DataFrame containing the filtered data.
         :raises DataNotFoundException: If the data could not be found or is empty.
         """
         try:
-            sheet = self.data.parse(table_name)
-            data = self.get_corrected_data(sheet)
-
-            data = data[data[f'NUTS {data_level.value}'] == data_level.value]
-            if data.empty:
+            table = self._get_table(table_name)
+            if table.is_empty(data_level):
                 raise DataNotFoundException(f"No data found for table {table_name} with data level {data_level}.")
-            return data
+            columns = None if projection is None else projection.resolve(table.columns)
+            return table.get_page(data_level, after, limit, filters, columns)
+        except InvalidQueryException:
+            raise
+        except Exception as e:
+            raise DataNotFoundException(f"Error retrieving data from table {table_name}: {e}")
+
+    def get_columns(self, table_name: str) -> list:
+        """
+        Get the columns of the specified table, loads the table if it's not cached yet.
+
+        :param table_name: Name of the table (Excel sheet).
+        :return: Names of the columns in the order of the sheet.
+        :raises DataNotFoundException: If the sheet could not be parsed.
+        """
+        try:
+            return list(self._get_table(table_name).columns)
+        except Exception as e:
+            raise DataNotFoundException(f"Error retrieving the columns of table {table_name}: {e}")
+
+    def memory_usage(self, table_name: str) -> dict:
+        """
+        Report the memory used by the cached data of the specified table, the table isn't loaded by the report.
+
+        :param table_name: Name of the table (Excel sheet).
+        :return: Dictionary containing the number of rows, the total bytes and the dtype and the bytes of each column,
+            or None if the table isn't loaded yet.
+        """
+        table = self._tables.get(table_name)
+        return None if table is None else table.memory_usage()
+
+    def get_series(self, table_name: str, keys, key_column: str = 'EU-Code', first_year: int = None,
+                   last_year: int = None) -> pd.DataFrame:
+        """
+        Retrieve the rows of the given regions, regardless of their data level.
+
+        The regions are looked up in the series index that is built once when the table is loaded, so the cost only
+        depends on the number of the regions and only their rows are materialized.
+
+        :param table_name: Name of the table (Excel sheet).
+        :param keys: Values of the key column of the regions.
+        :param key_column: Column that identifies the regions, one of `SERIES_KEY_COLUMNS`.
+        :param first_year: First year column to retrieve, starts with the earliest year if not provided.
+        :param last_year: Last year column to retrieve, ends with the latest year if not provided.
+        :return: DataFrame containing a row for each of the found regions in the order of the keys, unknown keys are
+            skipped.
+        :raises DataNotFoundException: If the data could not be found.
+        :raises InvalidQueryException: If the key column isn't supported.
+        """
+        try:
+            table = self._get_table(table_name)
+            columns = None
+            if first_year is not None or last_year is not None:
+                columns = Projection(None, first_year, last_year).resolve(table.columns)
+            return table.get_rows(key_column, keys, columns)
+        except InvalidQueryException:
+            raise
         except Exception as e:
             raise DataNotFoundException(f"Error retrieving data from table {table_name}: {e}")
 
+    @staticmethod
+    def is_data_sheet(sheet) -> bool:
+        """
+        Check whether the given sheet contains a data table, i.e. whether its header row contains the key column.
+
+        :param sheet: Sheet to check (Excel sheet).
+        :return: Whether the sheet is a data sheet.
+        """
+        if len(sheet) <= ExcelDataSource.metadata_rows + 1:
+            return False
+        return KEY_COLUMN in set(sheet.iloc[ExcelDataSource.metadata_rows])
+
     @staticmethod
     def get_corrected_data(sheet) -> pd.DataFrame:
         """
@@ -131,68 +1336,475 @@ class ExcelDataSource(FileDataSource):
         :raises MetadataNotFoundException: If the metadata could not be found or is empty.
         """
         try:
-            metadata = ExcelDataSource.extract_metadata(self.data, table_name)
+            self._refresh_if_changed()
+            metadata = self._get_metadata(table_name)
             if metadata.empty:
                 raise MetadataNotFoundException(f"No metadata found for table {table_name}.")
             return metadata
         except Exception as e:
             raise MetadataNotFoundException(f"Error retrieving metadata from table {table_name}: {e}")
 
+    def _get_metadata(self, table_name: str) -> pd.DataFrame:
+        """
+        Get the cached metadata of the given table, read it from the snapshot or the Excel file if it's not cached yet.
+
+        :param table_name: Name of the table (Excel sheet).
+        :return: DataFrame containing the metadata.
+        """
+        metadata = self._metadata.get(table_name)
+        if metadata is None:
+            metadata = self._read_snapshot(table_name, metadata_only=True)
+            if metadata is None:
+                metadata = ExcelDataSource.extract_metadata(self.data, table_name)
+            self._metadata[table_name] = metadata
+        return metadata
+
     @staticmethod
     def extract_metadata(data: pd.ExcelFile, table_name: str) -> pd.DataFrame:
         """
         Extract the metadata of the wanted table from the given Excel file
 
+        Only the first column of the metadata rows is read, so the (much larger) data part of the sheet isn't parsed.
         Please note that this function is designed to skip the "Zurück zum Inhaltsverzeichnis" line
 
         :param data: Excel file to extract its metadata
         :param table_name: Name of the table to get its metadata
         :return: DataFrame containing the metadata
         """
-        meta_data = data.parse(table_name, header=None).iloc[:ExcelDataSource.metadata_rows, 0]
+        meta_data = data.parse(table_name, header=None, nrows=ExcelDataSource.metadata_rows,
+                               usecols=[0]).iloc[:ExcelDataSource.metadata_rows, 0]
         return meta_data.astype(str)
 
 
+def _parse_excel_sheet(file_name: str, table_name: str) -> pd.DataFrame:
+    """
+    Parse and correct a single sheet of the given Excel file, used to parse sheets in worker processes.
+
+    :param file_name: Path to the Excel file.
+    :param table_name: Name of the table (Excel sheet).
+    :return: Corrected data of the sheet.
+    """
+    return ExcelDataSource.get_corrected_data(pd.read_excel(file_name, sheet_name=table_name))
+
+
+def _parse_excel_data_sheet(file_name: str, sheet_name: str):
+    """
+    Parse and correct a single sheet of the given Excel file if it's a data sheet, used to import sheets in worker
+    processes.
+
+    :param file_name: Path to the Excel file.
+    :param sheet_name: Name of the Excel sheet.
+    :return: Tuple containing the corrected data of the sheet and its content hash, or None if the sheet doesn't
+        contain a data table (e.g. the title page).
+    """
+    sheet = pd.read_excel(file_name, sheet_name=sheet_name)
+    if not ExcelDataSource.is_data_sheet(sheet):
+        return None
+    corrected_data = ExcelDataSource.get_corrected_data(sheet)
+    return corrected_data, SQLiteDataSource.get_content_hash(corrected_data)
+
+
 class DatabaseDataSource(BaseDataSource):
-    def __init__(self, connection_string):
+    def __init__(self, connection_string, pool_size: int = None, max_overflow: int = None, pool_pre_ping: bool = False,
+                 pool_recycle: int = -1):
         """
         Initialize the DatabaseDataSource.
 
         This class is intended to be used either as an abstract base class or as a stand-alone class, in this project,
         we only explore the first case
+
+        Reflected tables are cached and only reflected again after the schema of the database has changed.
+
+        Subclasses that provide an async connection string (see `get_async_connection_string`) run the queries of
+        `aget_data` on an async engine with the same pool settings, others fall back to the async executor.
+
+        :param connection_string: SQLAlchemy connection string of the database.
+        :param pool_size: Number of connections to keep open in the connection pool, uses SQLAlchemy's default if not
+            provided.
+        :param max_overflow: Number of connections that can be opened beyond the pool size, uses SQLAlchemy's default if
+            not provided.
+        :param pool_pre_ping: Whether to test the connections for liveness before using them.
+        :param pool_recycle: Number of seconds after which connections are recycled, -1 disables recycling.
         """
         super().__init__()
-        self.engine = create_engine(connection_string)
+        engine_options = {'pool_pre_ping': pool_pre_ping, 'pool_recycle': pool_recycle}
+        if pool_size is not None:
+            engine_options['pool_size'] = pool_size
+        if max_overflow is not None:
+            engine_options['max_overflow'] = max_overflow
+        self.engine = create_engine(connection_string, **engine_options)
+        self.configure_engine(self.engine)
+        self._engine_options = engine_options
+        self._async_engine = None
         # self.metadata = MetaData(bind=self.engine)
         self.metadata = MetaData()
         self.Session = sessionmaker(bind=self.engine)
+        self._tables = {}
+        self._schema_version = None
+        self._tables_lock = threading.Lock()
+
+    def after_fork(self):
+        """
+        Reset the state that can't be shared with a forked child process, the child opens its own database connections
+        without closing the ones of the parent.
+        """
+        super().after_fork()
+        self.engine.dispose(close=False)
+        self._async_engine = None
+
+    def configure_engine(self, engine):
+        """
+        Configure a newly created (sync) engine of this data source, e.g. by adding event listeners to it.
+
+        :param engine: SQLAlchemy engine.
+        """
+        pass
+
+    def get_async_connection_string(self):
+        """
+        Get the SQLAlchemy connection string of the database for an async driver.
 
-    def get_data(self, table_name, data_level: DataLevel) -> pd.DataFrame:
+        :return: Async connection string, or None if the database has no async driver.
+        """
+        return None
+
+    @property
+    def async_engine(self):
+        """Async engine of this data source, created on its first usage, or None if there is no async driver."""
+        if self._async_engine is None:
+            connection_string = self.get_async_connection_string()
+            if connection_string is None:
+                return None
+            with self._tables_lock:
+                if self._async_engine is None:
+                    async_engine = create_async_engine(connection_string, **self._engine_options)
+                    self.configure_engine(async_engine.sync_engine)
+                    self._async_engine = async_engine
+        return self._async_engine
+
+    def get_schema_version(self, connection):
+        """
+        Get the version of the database schema, used to invalidate the cached tables when the schema changes.
+
+        :param connection: Connection to the database.
+        :return: Version of the schema, or None if the database doesn't provide one.
+        """
+        return None
+
+    def get_table(self, table_name: str, connection) -> Table:
+        """
+        Get the reflected table with the given name, only reflects it if it's not cached or the schema has changed.
+
+        If the database doesn't provide a schema version, the cached tables are kept until `invalidate_tables` is called.
+
+        :param table_name: Name of the table.
+        :param connection: Connection to the database.
+        :return: The reflected table.
+        """
+        schema_version = self.get_schema_version(connection)
+        if schema_version != self._schema_version:
+            with self._tables_lock:
+                if schema_version != self._schema_version:
+                    self.metadata = MetaData()
+                    self._tables = {}
+                    self._schema_version = schema_version
+
+        table = self._tables.get(table_name)
+        if table is None:
+            with self._tables_lock:
+                table = self._tables.get(table_name)
+                if table is None:
+                    table = Table(table_name, self.metadata, autoload_with=connection)
+                    self._tables[table_name] = table
+        return table
+
+    def invalidate_tables(self):
+        """Drop all the cached tables, so they get reflected again on their next usage."""
+        with self._tables_lock:
+            self.metadata = MetaData()
+            self._tables = {}
+
+    def get_data(self, table_name, data_level: DataLevel, after: int = None, limit: int = None,
+                 projection: Projection = None, filters: dict = None) -> pd.DataFrame:
         """
         Retrieve data from the specified table and data level.
 
+        The pagination is pushed down to the database as a `WHERE "Lfd. Nr." > ? ORDER BY "Lfd. Nr." LIMIT ?` query
+        and only the columns of the projection are selected. Prefix filters are expressed as range conditions, so they
+        can be answered by an index on the column.
+
         :param table_name: Name of the table.
         :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
         :return: DataFrame containing the filtered data.
         :raises DataNotFoundException: If the data could not be found or is empty.
         """
         try:
-            session = self.Session()
+            with self.engine.connect() as connection:
+                result = connection.execute(self.build_data_query(
+                    self.get_table(table_name, connection), data_level, after, limit, projection, filters))
+                # Create a Pandas DataFrame from the results
+                return self.normalize_data(pd.DataFrame(result.fetchall(), columns=list(result.keys())))
+        except InvalidQueryException:
+            raise
+        except Exception as e:
+            raise DataNotFoundException(f"Error retrieving data: {e}")
 
-            table = Table(table_name, self.metadata, autoload_with=self.engine)
+    def iter_data(self, table_name, data_level: DataLevel, chunk_size: int = STREAM_CHUNK_SIZE, after: int = None,
+                  projection: Projection = None, filters: dict = None):
+        """
+        Retrieve the data of the specified table and data level in chunks, ordered by the key column.
 
-            query = select(table).where(getattr(table.columns, f"NUTS {data_level.value}") == data_level.value)
+        The rows are read from a server-side cursor (on the databases that support it) with `fetchmany`, so only one
+        chunk is held in memory at a time regardless of the size of the table. The connection is held until the
+        generator is exhausted or closed.
 
-            result = session.execute(query).fetchall()
-            session.close()
+        :param table_name: Name of the table.
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param chunk_size: Maximum number of rows in each chunk.
+        :param after: Only return the rows whose key is greater than this value.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: Generator of DataFrames containing the consecutive chunks of the filtered data.
+        :raises DataNotFoundException: If the data could not be found.
+        """
+        try:
+            with self.engine.connect() as connection:
+                result = connection.execution_options(stream_results=True).execute(self.build_data_query(
+                    self.get_table(table_name, connection), data_level, after, None, projection, filters))
+                columns = list(result.keys())
+                rows = result.fetchmany(chunk_size)
+                yield self.normalize_data(pd.DataFrame(rows, columns=columns))
+                while rows:
+                    rows = result.fetchmany(chunk_size)
+                    if rows:
+                        yield self.normalize_data(pd.DataFrame(rows, columns=columns))
+        except InvalidQueryException:
+            raise
+        except Exception as e:
+            raise DataNotFoundException(f"Error retrieving data: {e}")
+
+    async def aget_data(self, table_name, data_level: DataLevel, after: int = None, limit: int = None,
+                        projection: Projection = None, filters: dict = None) -> pd.DataFrame:
+        """
+        Async counterpart of `get_data`, runs the query on the async engine (if there is one).
+
+        :param table_name: Name of the table.
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: DataFrame containing the filtered data.
+        :raises DataNotFoundException: If the data could not be found or is empty.
+        """
+        async_engine = self.async_engine
+        if async_engine is None:
+            return await super().aget_data(table_name, data_level, after, limit, projection, filters)
+
+        try:
+            async with async_engine.connect() as connection:
+                table = await connection.run_sync(lambda sync_connection: self.get_table(table_name, sync_connection))
+                result = await connection.execute(
+                    self.build_data_query(table, data_level, after, limit, projection, filters))
+                return self.normalize_data(pd.DataFrame(result.fetchall(), columns=list(result.keys())))
+        except InvalidQueryException:
+            raise
+        except Exception as e:
+            raise DataNotFoundException(f"Error retrieving data: {e}")
 
-            # Create a Pandas DataFrame from the results
-            df = pd.DataFrame(result, columns=[column.name for column in table.columns])
+    def get_columns(self, table_name: str) -> list:
+        """
+        Get the columns of the specified table from its reflected (and cached) schema, without querying any rows.
 
-            return df
+        :param table_name: Name of the table.
+        :return: Names of the columns in the order of the table.
+        :raises DataNotFoundException: If the table could not be found.
+        """
+        try:
+            with self.engine.connect() as connection:
+                return list(self.get_table(table_name, connection).columns.keys())
+        except Exception as e:
+            raise DataNotFoundException(f"Error retrieving the columns of table {table_name}: {e}")
+
+    def get_series(self, table_name, keys, key_column: str = 'EU-Code', first_year: int = None,
+                   last_year: int = None) -> pd.DataFrame:
+        """
+        Retrieve the rows of the given regions, regardless of their data level.
+
+        The regions are selected with an `IN` condition on the key column, which is answered by its index.
+
+        :param table_name: Name of the table.
+        :param keys: Values of the key column of the regions.
+        :param key_column: Column that identifies the regions, one of `SERIES_KEY_COLUMNS`.
+        :param first_year: First year column to retrieve, starts with the earliest year if not provided.
+        :param last_year: Last year column to retrieve, ends with the latest year if not provided.
+        :return: DataFrame containing a row for each of the found regions in the order of the keys, unknown keys are
+            skipped.
+        :raises DataNotFoundException: If the data could not be found.
+        :raises InvalidQueryException: If the key column isn't supported.
+        """
+        if key_column not in SERIES_KEY_COLUMNS:
+            raise InvalidQueryException(f"Looking up regions by column {key_column} is not supported")
+        keys = list(dict.fromkeys(keys))
+        try:
+            with self.engine.connect() as connection:
+                table = self.get_table(table_name, connection)
+                columns = [table.columns[column] for column in
+                           Projection(None, first_year, last_year).resolve(table.columns.keys())]
+                result = connection.execute(select(*columns).where(table.columns[key_column].in_(keys)))
+                data = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        except InvalidQueryException:
+            raise
         except Exception as e:
             raise DataNotFoundException(f"Error retrieving data: {e}")
 
+        data = self.normalize_data(data).drop_duplicates(key_column).set_index(key_column, drop=False)
+        return data.loc[[key for key in keys if key in data.index]].reset_index(drop=True)
+
+    def aggregate(self, table_name, data_level: DataLevel, operation: str, group: str = None,
+                  first_year: int = None, last_year: int = None, filters: dict = None) -> pd.DataFrame:
+        """
+        Aggregate the year columns of the specified table and data level.
+
+        The aggregation is pushed down to the database as a `GROUP BY` query, only the growth rates are computed from
+        the aggregated sums afterwards.
+
+        :param table_name: Name of the table.
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param operation: Aggregate operation, one of `AGGREGATE_OPERATIONS`.
+        :param group: Column to group the rows by, one of `AGGREGATE_GROUP_COLUMNS`, aggregates all the rows if None.
+        :param first_year: First year column to aggregate, starts with the earliest year if not provided.
+        :param last_year: Last year column to aggregate, ends with the latest year if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: DataFrame containing one row per group (ordered by the group) with the group column (if grouped) and
+            the aggregated year columns.
+        :raises DataNotFoundException: If the data could not be found.
+        :raises InvalidQueryException: If the aggregation or the filters aren't supported.
+        """
+        validate_aggregation(operation, group)
+        try:
+            with self.engine.connect() as connection:
+                result = connection.execute(self.build_aggregate_query(
+                    self.get_table(table_name, connection), data_level, operation, group, first_year, last_year,
+                    filters))
+                data = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        except InvalidQueryException:
+            raise
+        except Exception as e:
+            raise DataNotFoundException(f"Error retrieving data: {e}")
+
+        year_columns = [column for column in data.columns if is_year_column(column)]
+        data[year_columns] = data[year_columns].astype(np.float64)
+        if operation == 'growth':
+            data[year_columns] = growth_rates(data[year_columns])
+        return data
+
+    def build_aggregate_query(self, table: Table, data_level: DataLevel, operation: str, group: str = None,
+                              first_year: int = None, last_year: int = None, filters: dict = None):
+        """
+        Build the query that aggregates the year columns of the given table and data level.
+
+        :param table: Reflected table.
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param operation: Aggregate operation, one of `AGGREGATE_OPERATIONS`, 'growth' selects the sums.
+        :param group: Column to group the rows by, aggregates all the rows if None.
+        :param first_year: First year column to aggregate, starts with the earliest year if not provided.
+        :param last_year: Last year column to aggregate, ends with the latest year if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: The aggregate query.
+        :raises InvalidQueryException: If the group column or the filters contain unknown columns.
+        """
+        reduction = {'sum': func.sum, 'mean': func.avg, 'min': func.min, 'max': func.max, 'growth': func.sum}[operation]
+        years = Projection((), first_year, last_year)
+        columns = [reduction(self.get_numeric_column(column)).label(column.name) for column in table.columns
+                   if is_year_column(column.name) and years.includes_year(int(column.name))]
+
+        if group is None:
+            return self.filter_query(select(*columns), table, data_level, filters)
+
+        if group not in table.columns:
+            raise InvalidQueryException(f"Grouping by column {group} is not supported")
+        group_column = table.columns[group]
+        query = self.filter_query(select(group_column, *columns), table, data_level, filters)
+        return query.where(group_column.is_not(None)).group_by(group_column).order_by(group_column)
+
+    @staticmethod
+    def get_numeric_column(column: Column):
+        """
+        Get the given year column as an expression that is numeric.
+
+        :param column: Year column of a reflected table.
+        :return: The column, or its values cast to floats if it isn't stored as numbers ('.' becomes null).
+        """
+        if isinstance(column.type, (Float, Integer)):
+            return column
+        return cast(func.nullif(column, '.'), Float)
+
+    def filter_query(self, query, table: Table, data_level: DataLevel, filters: dict = None):
+        """
+        Restrict the given query to the rows of the data level that match the filters.
+
+        :param query: Query that selects from the given table.
+        :param table: Reflected table.
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: The restricted query.
+        :raises InvalidQueryException: If the filters contain unknown columns.
+        """
+        query = query.where(getattr(table.columns, f"NUTS {data_level.value}") == data_level.value)
+        for column_name, value in (filters or {}).items():
+            if column_name not in FILTER_COLUMNS or column_name not in table.columns:
+                raise InvalidQueryException(f"Filtering on column {column_name} is not supported")
+            column = table.columns[column_name]
+            if column_name in PREFIX_FILTER_COLUMNS:
+                query = query.where(column >= value, column < value + _MAX_CHARACTER)
+            else:
+                query = query.where(column == value)
+        return query
+
+    def build_data_query(self, table: Table, data_level: DataLevel, after: int = None, limit: int = None,
+                         projection: Projection = None, filters: dict = None):
+        """
+        Build the query that selects the data of the given table and data level.
+
+        :param table: Reflected table.
+        :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only select the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to select, selects all the rows if not provided.
+        :param projection: Subset of the columns to select, selects all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
+        :return: The select query.
+        :raises InvalidQueryException: If the projection or the filters contain unknown columns.
+        """
+        key_column = self.get_key_column(table)
+        columns = list(table.columns) if projection is None else [
+            table.columns[column] for column in projection.resolve(table.columns.keys())]
+
+        query = self.filter_query(select(*columns), table, data_level, filters)
+        if after is not None:
+            query = query.where(key_column > after)
+        query = query.order_by(key_column)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    @staticmethod
+    def get_key_column(table: Table):
+        """
+        Get the key column of the given table as an expression that is ordered numerically.
+
+        :param table: Reflected table.
+        :return: The key column, cast to an integer if it isn't stored as one.
+        """
+        key_column = table.columns[KEY_COLUMN]
+        if isinstance(key_column.type, Integer):
+            return key_column
+        return cast(key_column, Integer)
+
     def get_metadata(self, table_name: str) -> pd.DataFrame:
         """
         Retrieve metadata from the specified table.
@@ -214,82 +1826,376 @@ class DatabaseDataSource(BaseDataSource):
 
 
 class SQLiteDataSource(DatabaseDataSource):
-    def __init__(self, db_path: str, create_tables_from_excel: bool = False, excel_file: str = None):
+    def __init__(self, db_path: str, create_tables_from_excel: bool = False, excel_file: str = None,
+                 pool_size: int = None, max_overflow: int = None, pool_pre_ping: bool = False, pool_recycle: int = -1,
+                 read_only: bool = False, pragmas: dict = None, import_chunk_size: int = IMPORT_CHUNK_SIZE,
+                 import_max_workers: int = None):
         """
         Initialize the SQLiteDataSource.
 
         This class will load the data from an SQLite database and will create the database if it doesn't exist
-        using the specified Excel file (if allowed). Only generates tables for the '1.1' and '3.1' tables.
+        using the specified Excel file (if allowed). Generates a table for every data sheet of the Excel file.
+
+        The given pragmas are applied to every connection, the tables are always created through a separate writable
+        connection, so the connections serving the data can be opened read-only.
 
         :param db_path: Path to the database file.
         :param create_tables_from_excel: Boolean to specify whether to create the database from the Excel file or not.
         :param excel_file: Path to the backup Excel file.
+        :param pool_size: Number of connections to keep open in the connection pool.
+        :param max_overflow: Number of connections that can be opened beyond the pool size.
+        :param pool_pre_ping: Whether to test the connections for liveness before using them.
+        :param pool_recycle: Number of seconds after which connections are recycled, -1 disables recycling.
+        :param read_only: Whether to open the connections serving the data read-only.
+        :param pragmas: Maps the names of SQLite pragmas (e.g. `journal_mode`, `mmap_size` or `cache_size`) to their
+            values.
+        :param import_chunk_size: Number of rows inserted by each executemany call when importing a sheet.
+        :param import_max_workers: Maximum number of worker processes parsing the sheets, uses the number of CPUs if not
+            provided.
         """
-        connection_string = f'sqlite:///{db_path}'
-        super().__init__(connection_string)
+        if read_only:
+            connection_string = f'sqlite:///file:{urllib.parse.quote(db_path)}?mode=ro&uri=true'
+        else:
+            connection_string = f'sqlite:///{db_path}'
+        super().__init__(connection_string, pool_size, max_overflow, pool_pre_ping, pool_recycle)
         self.db_path = db_path
         self.create_tables_from_excel = create_tables_from_excel
         self.excel_file = excel_file
+        self.read_only = read_only
+        self.pragmas = pragmas or {}
+        self.import_chunk_size = import_chunk_size
+        self.import_max_workers = import_max_workers
 
         if create_tables_from_excel and not os.path.exists(db_path):
             self.create_tables_from_excel_file()
 
-    def create_tables_from_excel_file(self):
+    def _apply_pragmas(self, dbapi_connection, connection_record):
+        """
+        Apply the configured pragmas to a new connection, used as the `connect` event listener of the engines.
+
+        :param dbapi_connection: Newly opened DBAPI connection.
+        :param connection_record: Pool record of the connection.
+        """
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+    def configure_engine(self, engine):
         """
-        Backup function that creates database from an Excel file if it doesn't exist
+        Apply the configured pragmas to every connection of the given engine.
 
-        Only generates tables for the '1.1' and '3.1' tables
+        :param engine: SQLAlchemy engine.
+        """
+        event.listen(engine, 'connect', self._apply_pragmas)
+
+    def get_async_connection_string(self):
+        """
+        Get the connection string of the database for the aiosqlite driver, read-only if the data source is read-only.
+
+        :return: Async connection string.
+        """
+        if self.read_only:
+            return f'sqlite+aiosqlite:///file:{urllib.parse.quote(self.db_path)}?mode=ro&uri=true'
+        return f'sqlite+aiosqlite:///{self.db_path}'
+
+    def create_write_engine(self):
+        """
+        Create an engine with a writable connection to the database, used to create the tables.
+
+        :return: SQLAlchemy engine, should be disposed by the caller.
+        """
+        engine = create_engine(f'sqlite:///{self.db_path}')
+        self.configure_engine(engine)
+
+        # let SQLAlchemy control the transactions, by default the driver doesn't include DDL statements in them, so
+        # tables couldn't be swapped atomically
+        @event.listens_for(engine, 'connect')
+        def disable_driver_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, 'begin')
+        def begin_immediate(connection):
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+        return engine
+
+    def get_schema_version(self, connection):
+        """
+        Get the version of the database schema, SQLite increments it whenever the schema changes.
+
+        :param connection: Connection to the database.
+        :return: Version of the schema.
+        """
+        return connection.exec_driver_sql('PRAGMA schema_version').scalar()
+
+    @property
+    def version(self):
+        """
+        Version of the data served by this data source, changes whenever the database file (or its WAL file) changes.
+
+        :return: Tuple containing the modification times and the sizes of the database files, or None if the database
+            doesn't exist.
+        """
+        version = ()
+        for path in [self.db_path, f'{self.db_path}-wal']:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            version += (stat.st_mtime_ns, stat.st_size)
+        return version or None
+
+    def create_tables_from_excel_file(self, force: bool = False) -> list:
+        """
+        Create or update the database tables from the Excel file.
+
+        Every sheet of the Excel file is parsed in a pool of worker processes and the sheets that contain a data table
+        are imported into a table with the same name. The content hash of every imported sheet is recorded in the
+        bookkeeping table, only the sheets whose hash changed since their last import are imported again. Tables of
+        sheets that were removed from the Excel file are dropped.
+
+        The changed sheets are imported into staging tables which are swapped in, together with the update of the
+        bookkeeping table, in a single transaction. Connections serving the data keep reading the previous tables
+        until that transaction is committed. Sheets that fail to import are logged and skipped.
+
+        :param force: Whether to import all the data sheets, even the ones that haven't changed.
+        :return: Names of the imported sheets.
         """
         if not self.excel_file:
             raise DataSourceException("Excel file must be provided to create tables")
 
-        excel_data_source = ExcelDataSource(self.excel_file)
-        excel_data = excel_data_source.data
+        sheet_names = ExcelDataSource(self.excel_file).data.sheet_names
 
-        # for sheet_name in excel_data.sheet_names:
-        for sheet_name in ['1.1', '3.1']:
-            try:
-                sheet_data = excel_data.parse(sheet_name)
-                self.create_table_from_sheet(sheet_name, sheet_data)
-                # self.add_metadata_to_database(sheet_name, excel_data)
-            except Exception as e:
-                print(f"Error processing sheet '{sheet_name}': {e}")
+        engine = self.create_write_engine()
+        try:
+            import_state = self.get_import_state_table()
+            import_state.create(engine, checkfirst=True)
+            with engine.connect() as connection:
+                imported_hashes = dict(connection.execute(
+                    select(import_state.c.sheet_name, import_state.c.content_hash)).fetchall())
+
+            changed_sheets = {}
+            with ProcessPoolExecutor(max_workers=self.import_max_workers) as executor:
+                futures = {sheet_name: executor.submit(_parse_excel_data_sheet, self.excel_file, sheet_name)
+                           for sheet_name in sheet_names}
+                for sheet_name, future in futures.items():
+                    try:
+                        parsed_sheet = future.result()
+                    except Exception as e:
+                        logger.error(f"Error processing sheet '{sheet_name}': {e}")
+                        continue
+                    if parsed_sheet is None:
+                        continue
+                    if not force and imported_hashes.get(sheet_name) == parsed_sheet[1]:
+                        logger.info(f"Table {sheet_name} is up to date")
+                        continue
+                    changed_sheets[sheet_name] = parsed_sheet
+
+            imported_sheets = []
+            with engine.begin() as connection:
+                for sheet_name, (corrected_data, content_hash) in changed_sheets.items():
+                    try:
+                        with connection.begin_nested():
+                            row_count = self.import_table(connection, sheet_name, corrected_data)
+                            connection.execute(import_state.delete().where(import_state.c.sheet_name == sheet_name))
+                            connection.execute(import_state.insert().values(
+                                sheet_name=sheet_name, content_hash=content_hash, row_count=row_count,
+                                imported_at=time.time()))
+                        imported_sheets.append(sheet_name)
+                        # self.add_metadata_to_database(sheet_name, excel_data)
+                    except Exception as e:
+                        logger.error(f"Error processing sheet '{sheet_name}': {e}")
+
+                for sheet_name in set(imported_hashes) - set(sheet_names):
+                    logger.info(f"Dropping table {sheet_name}, its sheet was removed from the Excel file")
+                    Table(sheet_name, MetaData()).drop(connection, checkfirst=True)
+                    connection.execute(import_state.delete().where(import_state.c.sheet_name == sheet_name))
+            return imported_sheets
+        finally:
+            engine.dispose()
+
+    @staticmethod
+    def get_import_state_table() -> Table:
+        """
+        Get the bookkeeping table that records the content hash of every imported sheet.
+
+        :return: The (not reflected) bookkeeping table.
+        """
+        return Table(
+            IMPORT_STATE_TABLE, MetaData(),
+            Column('sheet_name', String, primary_key=True),
+            Column('content_hash', String, nullable=False),
+            Column('row_count', Integer),
+            Column('imported_at', Float),
+        )
+
+    @staticmethod
+    def get_content_hash(corrected_data: pd.DataFrame) -> str:
+        """
+        Compute the content hash of the corrected data of a sheet, used to detect the sheets that changed.
 
-    def create_table_from_sheet(self, sheet_name: str, sheet_data: pd.DataFrame):
+        :param corrected_data: Corrected data of the sheet.
+        :return: Hexadecimal SHA-256 hash of the import format version, the column names and the values.
+        """
+        content = f'{IMPORT_FORMAT_VERSION}:' + corrected_data.to_json(orient='split', index=False)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def create_table_from_sheet(self, sheet_name: str, sheet_data: pd.DataFrame, engine=None):
         """
         Create a table in the database from the data in the specified sheet.
 
         :param sheet_name: Name of the sheet.
         :param sheet_data: DataFrame containing the sheet data.
+        :param engine: Writable SQLAlchemy engine, creates one if not provided.
         """
         if sheet_data.empty:
             raise DataNotFoundException(f"No data found for sheet '{sheet_name}'")
 
-        with self.engine.connect() as connection:
-            corrected_data = ExcelDataSource.get_corrected_data(sheet_data)
+        self.create_table_from_data(sheet_name, ExcelDataSource.get_corrected_data(sheet_data), engine)
+
+    def create_table_from_data(self, table_name: str, corrected_data: pd.DataFrame, engine=None) -> int:
+        """
+        Create a table in the database from the corrected data of a sheet.
+
+        The table is created with a typed schema (see `create_table_from_dataframe_header`), the values of the year
+        columns that aren't numbers (e.g. '.' for the missing values) are kept as text, which SQLite stores as is in the
+        REAL columns, so they are served like by the Excel data source. The table is created and
+        filled in a single transaction using batched executemany calls, the indexes are only created after the rows
+        have been inserted.
+
+        :param table_name: Name of the table.
+        :param corrected_data: Corrected data of the sheet.
+        :param engine: Writable SQLAlchemy engine, creates one if not provided.
+        :return: Number of imported rows.
+        """
+        write_engine = engine or self.create_write_engine()
+        try:
+            with write_engine.begin() as connection:
+                return self.import_table(connection, table_name, corrected_data)
+        finally:
+            if engine is None:
+                write_engine.dispose()
+
+    def import_table(self, connection, table_name: str, corrected_data: pd.DataFrame) -> int:
+        """
+        Import the corrected data of a sheet into a staging table and swap it in place of the table with the given name.
+
+        Should be called inside a transaction, so the swap only becomes visible once the transaction is committed.
+
+        :param connection: Writable SQLAlchemy connection.
+        :param table_name: Name of the table.
+        :param corrected_data: Corrected data of the sheet.
+        :return: Number of imported rows.
+        """
+        start_time = time.perf_counter()
+        rows = self.get_typed_rows(corrected_data)
+        preparer = connection.dialect.identifier_preparer
+
+        # create the table schema
+        staging_table_name = f'{table_name}{STAGING_TABLE_SUFFIX}'
+        staging_table = self.create_table_from_dataframe_header(connection, staging_table_name, corrected_data)
+
+        insert_statement = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            preparer.quote(staging_table_name),
+            ', '.join(preparer.quote(column.name) for column in staging_table.columns),
+            ', '.join('?' for _ in staging_table.columns))
+        for start in range(0, len(rows), self.import_chunk_size):
+            connection.exec_driver_sql(insert_statement, rows[start:start + self.import_chunk_size])
+
+        # swap the staging table in
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {preparer.quote(table_name)}')
+        connection.exec_driver_sql(
+            f'ALTER TABLE {preparer.quote(staging_table_name)} RENAME TO {preparer.quote(table_name)}')
+        table = Table(table_name, MetaData(), *[Column(column.name, column.type) for column in staging_table.columns])
+        self.create_table_indexes(connection, table)
+
+        elapsed_time = time.perf_counter() - start_time
+        logger.info(f"Imported {len(rows)} rows into table {table_name} in {elapsed_time:.2f}s "
+                    f"({len(rows) / max(elapsed_time, 1e-9):.0f} rows/s)")
+        return len(rows)
+
+    @staticmethod
+    def get_typed_rows(df: pd.DataFrame) -> list:
+        """
+        Convert a corrected sheet to rows whose values match the types of `create_table_from_dataframe_header`.
+
+        :param df: Corrected sheet data.
+        :return: List of tuples, one for each row, containing the values in the order of the columns.
+        """
+        df = df.copy()
+        for column_name in df.columns:
+            if column_name == KEY_COLUMN:
+                df[column_name] = pd.to_numeric(df[column_name], errors='coerce').astype('Int64')
+            elif is_year_column(column_name):
+                numeric_values = pd.to_numeric(df[column_name], errors='coerce')
+                df[column_name] = numeric_values.astype(object).where(numeric_values.notna(), df[column_name])
+            else:
+                df[column_name] = df[column_name].map(lambda value: None if pd.isna(value) else str(value))
+        df = df.astype(object).where(df.notna(), None)
+        return list(df.itertuples(index=False, name=None))
+
+    @staticmethod
+    def get_numeric_column(column: Column):
+        """
+        Get the given year column as an expression that is numeric.
 
-            # create the table schema
-            self.create_table_from_dataframe_header(self.engine, sheet_name, corrected_data)
+        The REAL year columns also contain the values that aren't numbers as text (see `get_typed_rows`), which the
+        aggregate functions would count as 0, so only the values stored as numbers are kept.
 
-            corrected_data.to_sql(sheet_name, con=connection, if_exists='replace', index=False)
+        :param column: Year column of a reflected table.
+        :return: The numeric values of the column, null for the other values.
+        """
+        if isinstance(column.type, (Float, Integer)):
+            return case((func.typeof(column).in_(('integer', 'real')), column))
+        return DatabaseDataSource.get_numeric_column(column)
 
     @staticmethod
-    def create_table_from_dataframe_header(engine, table_name, df):
+    def create_table_indexes(connection, table: Table):
+        """
+        Create the indexes of a table created by `create_table_from_dataframe_header`.
+
+        Besides the indexes on the filter columns, an index on each `NUTS n` column together with the key column is
+        created, so the (paginated) queries of a data level are answered by an index seek in key order.
+
+        :param connection: SQLAlchemy connection or engine.
+        :param table: The created table.
+        """
+        indexes = []
+        for level in DataLevel:
+            level_column = f'NUTS {level.value}'
+            if level_column in table.columns and KEY_COLUMN in table.columns:
+                indexes.append(Index(f'ix_{table.name}_{level_column}', table.columns[level_column],
+                                     table.columns[KEY_COLUMN]))
+        for column_name in FILTER_COLUMNS:
+            if column_name in table.columns:
+                indexes.append(Index(f'ix_{table.name}_{column_name}', table.columns[column_name]))
+
+        for index in indexes:
+            index.create(connection)
+
+    @staticmethod
+    def create_table_from_dataframe_header(engine, table_name, df) -> Table:
         """
         Create a SQLAlchemy table using the header of a Pandas DataFrame.
 
-        :param engine: SQLAlchemy engine.
+        The key column is stored as INTEGER, the year columns as REAL and all the other columns as TEXT, since the
+        corrected sheets only contain object columns. An existing table with the same name is replaced.
+
+        :param engine: SQLAlchemy engine or connection.
         :param table_name: Name of the table to create.
         :param df: DataFrame whose header will be used to create the table.
+        :return: The created table.
         """
         metadata = MetaData()
         columns = []
 
         for column_name in df.columns:
-            column_type = df[column_name].dtype
-            if column_type == 'int64':
+            if column_name == KEY_COLUMN:
                 column_type = Integer
-            elif column_type == 'float64':
+            elif is_year_column(column_name):
                 column_type = Float
             else:
                 column_type = String
@@ -300,7 +2206,9 @@ class SQLiteDataSource(DatabaseDataSource):
         table = Table(table_name, metadata, *columns)
 
         # Create the table in the database
+        table.drop(engine, checkfirst=True)
         metadata.create_all(engine)
+        return table
 
     def add_metadata_to_database(self, sheet_name: str, excel_data: pd.ExcelFile):
         """
@@ -323,20 +2231,22 @@ class SQLiteDataSource(DatabaseDataSource):
         #         for k, v in value.items():
         #             connection.execute(sql, table_name=sheet_name, key=k, value=v)
 
-    def get_data(self, table_name, data_level: DataLevel) -> pd.DataFrame:
+    def get_data(self, table_name, data_level: DataLevel, after: int = None, limit: int = None,
+                 projection: Projection = None, filters: dict = None) -> pd.DataFrame:
         """
         Retrieve data from the specified table and data level.
 
         :param table_name: Name of the table.
         :param data_level: Data level to filter on (NUTS 1, NUTS 2, or NUTS 3).
+        :param after: Only return the rows whose key is greater than this value.
+        :param limit: Maximum number of rows to return, returns all the rows if not provided.
+        :param projection: Subset of the columns to return, returns all the columns if not provided.
+        :param filters: Maps the filter columns to the value they must have (or start with, for the prefix columns).
         :return: DataFrame containing the filtered data.
         :raises DataNotFoundException: If the data could not be found or is empty.
         """
-        if not os.path.exists(self.db_path) and self.create_tables_from_excel:
-            self.create_tables_from_excel_file()
-
         try:
-            return super().get_data(table_name, data_level)
+            return super().get_data(table_name, data_level, after, limit, projection, filters)
         except SQLAlchemyError as e:
             raise DataNotFoundException(f"Error retrieving data: {e}")
 
@@ -365,15 +2275,31 @@ def get_data_source(config):
 
     if data_source_type == 'sqlite':
         db_config = config['data_source']['sqlite']
-        return SQLiteDataSource(
+        pool_config = db_config['pool']
+        data_source = SQLiteDataSource(
             db_path=db_config['db_path'],
             create_tables_from_excel=db_config['create_tables_from_excel'],
-            excel_file=db_config['excel_file']
+            excel_file=db_config['excel_file'],
+            pool_size=pool_config['size'],
+            max_overflow=pool_config['max_overflow'],
+            pool_pre_ping=pool_config['pre_ping'],
+            pool_recycle=pool_config['recycle'],
+            read_only=db_config['read_only'],
+            pragmas=db_config['pragmas'],
+            import_chunk_size=db_config['import']['chunk_size'],
+            import_max_workers=db_config['import']['max_workers'],
         )
     elif data_source_type == 'excel':
         excel_config = config['data_source']['excel']
-        return ExcelDataSource(
+        data_source = ExcelDataSource(
             file_name=excel_config['file_name'],
+            snapshot_dir=excel_config['snapshot_dir'],
+            storage=excel_config['storage'],
         )
     else:
         raise DataSourceException(f"Unknown data source type: {data_source_type}")
+
+    data_source.async_max_workers = config['data_source']['async_max_workers']
+    data_source.compact_dtypes = config['data_source']['dtypes']['compact']
+    data_source.float_dtype = config['data_source']['dtypes']['float_type']
+    return data_source
@@ -16,3 +16,8 @@ class DataNotFoundException(DataSourceException):
 class MetadataNotFoundException(DataSourceException):
     """Raised when metadata is not found in the specified table."""
     pass
+
+
+class InvalidQueryException(DataSourceException):
+    """Raised when a query contains invalid parameters, e.g. unknown columns."""
+    pass
@@ -0,0 +1,57 @@
+import argparse
+import logging
+
+from app.config import load_config
+from app.data_source import SQLiteDataSource
+
+logger = logging.getLogger(__name__)
+
+
+def import_excel_file(config, force: bool = False) -> list:
+    """
+    Import the changed sheets of the configured Excel file into the configured SQLite database.
+
+    Only the sheets whose content changed since their last import are imported, the other tables are kept as they are.
+    The app can keep serving the data from the database while the import is running.
+
+    :param config: Validated config.
+    :param force: Whether to import all the data sheets, even the ones that haven't changed.
+    :return: Names of the imported sheets.
+    """
+    db_config = config['data_source']['sqlite']
+    data_source = SQLiteDataSource(
+        db_path=db_config['db_path'],
+        excel_file=db_config['excel_file'],
+        pragmas=db_config['pragmas'],
+        import_chunk_size=db_config['import']['chunk_size'],
+        import_max_workers=db_config['import']['max_workers'],
+    )
+    try:
+        return data_source.create_tables_from_excel_file(force=force)
+    finally:
+        data_source.engine.dispose()
+
+
+def main(args=None):
+    """
+    Offline import command, imports the changed sheets of the Excel file into the SQLite database.
+
+    Usage: `python -m app.importer [--config config/config.yaml] [--force]`
+
+    :param args: Command line arguments, uses the arguments of the process if not provided.
+    """
+    parser = argparse.ArgumentParser(description='Import the changed sheets of the Excel file into the SQLite database.')
+    parser.add_argument('--config', default='config/config.yaml', help='Path to the config file.')
+    parser.add_argument('--force', action='store_true', help='Import all the sheets, even the ones that are unchanged.')
+    parsed_args = parser.parse_args(args)
+
+    config = load_config(parsed_args.config)
+    logging.basicConfig(level=getattr(logging, config['app']['log_level'].upper()),
+                        format=config['app']['log_format'])
+
+    imported_sheets = import_excel_file(config, force=parsed_args.force)
+    logger.info(f"Imported {len(imported_sheets)} sheets: {', '.join(imported_sheets) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
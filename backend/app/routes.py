@@ -1,36 +1,729 @@
-from flask import Blueprint, url_for, current_app, render_template
+import base64
+import binascii
+import hashlib
+import itertools
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet
+from flask import Blueprint, current_app, render_template, jsonify, Response, request
 from flask_restful import Api, Resource
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header
+
+from app.cache import ResponseCache
+from app.compression import Compressor
+from app.data_source import (DataLevel, DataSourceException, BaseDataSource, KEY_COLUMN, Projection,
+                             STREAM_CHUNK_SIZE, AGGREGATE_OPERATIONS, AGGREGATE_GROUP_COLUMNS, SERIES_KEY_COLUMNS,
+                             is_year_column)
+from app.exceptions import InvalidQueryException
+
+# Supported shapes of the data field of data responses, 'array' is a JSON array of records while 'string' is the legacy
+# shape in which the records are serialized into a JSON string
+DATA_PAYLOADS = ('array', 'string')
+
+# Formats of the data responses, maps the name of the format that can be given in the format query parameter to its
+# media type that can be given in the Accept header, JSON is the default format
+DATA_FORMATS = {
+    'json': 'application/json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Formats that can be streamed chunk by chunk, the ndjson format is always streamed
+STREAM_FORMATS = ('ndjson', 'csv', 'arrow')
+
+# End-of-stream marker of the Arrow IPC stream format
+ARROW_STREAM_END = b'\xff\xff\xff\xff\x00\x00\x00\x00'
+
+# Formats that are already compressed, so their responses are never compressed again
+COMPRESSED_FORMATS = ('parquet',)
+
+# Query parameters that filter the data, maps the name of the parameter to the filtered column
+FILTER_PARAMETERS = {
+    'land': 'Land',
+    'eu_code': 'EU-Code',
+    'regionalschluessel': 'Regional-schlüssel',
+}
+
+# Format of the years query parameter, either a single year or an (optionally open) range such as 2015..2021
+YEARS_PATTERN = re.compile(r'^(?:(?P<year>\d{4})|(?P<first_year>\d{4})?\.\.(?P<last_year>\d{4})?)$')
+
+# Tables served by the data blueprint, maps the resource name to the name of the table on the data source
+DATA_TABLES = {
+    'Bruftoinlandsprodukt_in_jeweiligen_Preisen': '1.1',
+    'Erwerbstaefige': '3.1',
+}
+
+
+def make_json_response(body: bytes, status: int = 200, encoding: str = None, mimetype: str = 'application/json') \
+        -> Response:
+    """
+    Create a response from an already serialized JSON body
+
+    :param body: serialized JSON body
+    :param status: status code of the response
+    :param encoding: content encoding the body is compressed with, if any
+    :param mimetype: media type of the body, used for the bodies of the other data formats
+    :return: the created response
+    """
+    response = Response(body, status=status, mimetype=mimetype)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def serialize_data_response(data: pd.DataFrame, payload: str = 'array', extra_fields: dict = None) -> bytes:
+    """
+    Serialize a successful data response
+
+    The records are serialized directly from the columns of the DataFrame by pandas and spliced into the response, so
+    they are only encoded once unless the legacy 'string' payload is requested.
+
+    :param data: data to serialize
+    :param payload: shape of the data field, either 'array' or 'string'
+    :param extra_fields: additional fields to add to the response
+    :return: serialized JSON body
+    """
+    records = data.to_json(orient='records')
+    if payload == 'string':
+        return json.dumps({'status': 'success', 'data': records, **(extra_fields or {})}).encode()
+
+    body = b'{"status": "success", "data": ' + records.encode()
+    if extra_fields:
+        body += b', ' + json.dumps(extra_fields)[1:-1].encode()
+    return body + b'}'
+
+
+def serialize_series_response(data: pd.DataFrame, key_column: str, keys: list, compact: bool = False) -> bytes:
+    """
+    Serialize a successful series response
+
+    :param data: rows of the found regions
+    :param key_column: column that identifies the regions
+    :param keys: requested values of the key column, the ones that weren't found are listed in the missing field
+    :param compact: whether to return the values of the years as a matrix instead of a record per region
+    :return: serialized JSON body
+    """
+    found_keys = set(data[key_column])
+    fields = {'key': key_column, 'missing': [key for key in keys if key not in found_keys]}
+    if not compact:
+        return serialize_data_response(data.drop(columns=['NUTS 1', 'NUTS 2', 'NUTS 3'], errors='ignore'),
+                                       extra_fields=fields)
+
+    year_columns = [column for column in data.columns if is_year_column(column)]
+    values = data[year_columns].apply(pd.to_numeric, errors='coerce').astype('float64')
+    fields = {'status': 'success', 'years': [int(column) for column in year_columns],
+              'regions': list(data[key_column]), **fields}
+    return json.dumps(fields)[:-1].encode() + b', "values": ' + values.to_json(orient='values').encode() + b'}'
+
+
+def to_arrow_table(data: pd.DataFrame) -> pa.Table:
+    """
+    Convert data to an Arrow table with the types of the columnar data formats
+
+    :param data: data to convert
+    :return: the converted table, its schema only depends on the columns of the data
+    """
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if is_year_column(column):
+            values = pd.to_numeric(values, errors='coerce').astype('float64')
+        elif column == KEY_COLUMN:
+            values = pd.to_numeric(values).astype('int64')
+        else:
+            values = values.astype('string')
+        columns[str(column)] = pa.array(values, from_pandas=True)
+    return pa.table(columns)
+
+
+def serialize_data_chunks(chunks, data_format: str):
+    """
+    Serialize consecutive chunks of data to one of the streamed data formats
+
+    :param chunks: iterable of DataFrames containing the consecutive chunks of the data
+    :param data_format: one of `STREAM_FORMATS`
+    :return: generator of the serialized parts of the body
+    """
+    first_chunk = True
+    for chunk in chunks:
+        chunk = chunk.drop(columns=['NUTS 1', 'NUTS 2', 'NUTS 3'], errors='ignore')
+        if data_format == 'ndjson':
+            if not chunk.empty:
+                yield chunk.to_json(orient='records', lines=True).encode()
+        elif data_format == 'csv':
+            sink = pa.BufferOutputStream()
+            pa.csv.write_csv(to_arrow_table(chunk), sink, pa.csv.WriteOptions(include_header=first_chunk))
+            yield sink.getvalue().to_pybytes()
+        elif data_format == 'arrow':
+            table = to_arrow_table(chunk)
+            if first_chunk:
+                yield table.schema.serialize().to_pybytes()
+            for batch in table.to_batches():
+                yield batch.serialize().to_pybytes()
+        else:
+            raise ValueError(f"Unsupported format: {data_format}")
+        first_chunk = False
+
+    if data_format == 'arrow':
+        yield ARROW_STREAM_END
+
+
+def serialize_data_table(data: pd.DataFrame, data_format: str, metadata: dict = None) -> bytes:
+    """
+    Serialize data to one of the columnar data formats
+
+    The body is built from the columns of the DataFrame through an Arrow table, without any JSON step. The year columns
+    are stored as float64, values that aren't numbers (e.g. '.') become nulls, the key column as int64 and all the
+    other columns as strings.
+
+    :param data: data to serialize
+    :param data_format: either 'arrow' (Arrow IPC stream), 'parquet' or 'csv'
+    :param metadata: fields to store in the schema metadata of the Arrow and Parquet formats, None values are skipped
+    :return: serialized body
+    """
+    table = to_arrow_table(data)
+    if metadata:
+        table = table.replace_schema_metadata({key: value for key, value in metadata.items() if value is not None})
+
+    sink = pa.BufferOutputStream()
+    if data_format == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif data_format == 'parquet':
+        pa.parquet.write_table(table, sink)
+    elif data_format == 'csv':
+        pa.csv.write_csv(table, sink)
+    else:
+        raise ValueError(f"Unsupported format: {data_format}")
+    return sink.getvalue().to_pybytes()
+
+
+def parse_data_format(data_format: str = None, accept: str = None) -> str:
+    """
+    Select the format of a data response
+
+    :param data_format: format given in the format query parameter, takes precedence over the Accept header
+    :param accept: value of the Accept header of the request
+    :return: name of the selected format, 'json' if the client doesn't accept any of the other formats
+    :raises ValueError: If the given format is unknown
+    """
+    if data_format is not None:
+        if data_format not in DATA_FORMATS:
+            raise ValueError('Invalid format')
+        return data_format
+
+    if not accept:
+        return 'json'
+    media_type = parse_accept_header(accept, MIMEAccept).best_match(DATA_FORMATS.values())
+    return next((name for name, value in DATA_FORMATS.items() if value == media_type), 'json')
+
+
+def encode_cursor(key) -> str:
+    """
+    Encode the key of the last row of a page into an opaque cursor
+
+    :param key: key of the last row of the page
+    :return: the cursor pointing to the next page
+    """
+    return base64.urlsafe_b64encode(json.dumps({'after': int(key)}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decode a cursor created by `encode_cursor`
+
+    :param cursor: the cursor to decode
+    :return: key of the last row of the previous page
+    :raises ValueError: If the cursor is invalid
+    """
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor.encode()))['after']
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(after, int):
+        raise ValueError('Invalid cursor')
+    return after
+
+
+def parse_projection(columns: str = None, years: str = None):
+    """
+    Parse the columns and years query parameters into a projection
+
+    :param columns: comma separated names of the non-year columns to return
+    :param years: a single year or an (optionally open) range of years such as 2015..2021
+    :return: the parsed projection or None if none of the parameters are given
+    :raises ValueError: If the years are invalid
+    """
+    if columns is None and years is None:
+        return None
+
+    if columns is not None:
+        columns = [column.strip() for column in columns.split(',') if column.strip()]
+
+    first_year = last_year = None
+    if years is not None:
+        match = YEARS_PATTERN.match(years)
+        if match is None:
+            raise ValueError('Invalid years')
+        if match['year']:
+            first_year = last_year = int(match['year'])
+        else:
+            first_year = int(match['first_year']) if match['first_year'] else None
+            last_year = int(match['last_year']) if match['last_year'] else None
+
+    return Projection(columns, first_year, last_year)
+
+
+class DataRequestOptions:
+    def __init__(self, payload: str = 'array', limit: int = None, after: int = None, projection: Projection = None,
+                 filters: dict = None, data_format: str = 'json', stream: bool = False):
+        """
+        Options of a data request that are given in its query string
+
+        :param payload: shape of the data field, either 'array' or 'string'
+        :param limit: maximum number of the records in the response, returns all the records if not provided
+        :param after: only return the records after the row with this key, decoded from the cursor of the request
+        :param projection: subset of the columns to return, returns all the columns if not provided
+        :param filters: maps the filtered columns to their wanted values
+        :param data_format: format of the response, one of `DATA_FORMATS`
+        :param stream: whether to stream the response chunk by chunk, only supported by the `STREAM_FORMATS`
+        """
+        self.payload = payload
+        self.limit = limit
+        self.after = after
+        self.projection = projection
+        self.filters = filters or {}
+        self.data_format = data_format
+        self.stream = stream
+
+    @classmethod
+    def from_args(cls, args, default_payload: str = 'array', accept: str = None):
+        """
+        Parse the options from the query string of a request
+
+        :param args: query string arguments of the request
+        :param default_payload: payload to use if it's not specified in the request
+        :param accept: value of the Accept header of the request, used if the format isn't specified in the request
+        :return: the parsed options
+        :raises ValueError: If any of the options is invalid, the message of the error describes the invalid option
+        """
+        data_format = parse_data_format(args.get('format'), accept)
+
+        stream = args.get('stream')
+        if stream not in (None, 'true', 'false'):
+            raise ValueError('Invalid stream')
+        stream = stream == 'true' or data_format == 'ndjson'
+        if stream:
+            if data_format == 'json':
+                data_format = 'ndjson'
+            elif data_format not in STREAM_FORMATS:
+                raise ValueError(f'Streaming is not supported by the {data_format} format')
+
+        payload = args.get('payload', default_payload)
+        if payload not in DATA_PAYLOADS:
+            raise ValueError('Invalid payload')
+
+        limit = args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                raise ValueError('Invalid limit')
+            limit = int(limit)
+            if stream:
+                raise ValueError('Pagination is not supported by streamed responses')
+            if data_format == 'csv':
+                raise ValueError('Pagination is not supported by the csv format')
+
+        cursor = args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+
+        projection = parse_projection(args.get('columns'), args.get('years'))
+
+        filters = {column: args[parameter] for parameter, column in FILTER_PARAMETERS.items() if args.get(parameter)}
+
+        return cls(payload, limit, after, projection, filters, data_format, stream)
+
+    def cache_key(self) -> tuple:
+        """Hashable representation of the options, used as a part of the key of the cached responses"""
+        return (self.data_format, self.payload, self.limit, self.after,
+                self.projection and self.projection.cache_key(), tuple(sorted(self.filters.items())))
+
+
+class AggregateRequestOptions:
+    def __init__(self, operation: str = 'sum', group: str = None, first_year: int = None, last_year: int = None,
+                 filters: dict = None):
+        """
+        Options of an aggregate request that are given in its query string
+
+        :param operation: aggregate operation, one of `AGGREGATE_OPERATIONS`
+        :param group: column to group the records by, aggregates all the records if not provided
+        :param first_year: first year column to aggregate, starts with the earliest year if not provided
+        :param last_year: last year column to aggregate, ends with the latest year if not provided
+        :param filters: maps the filtered columns to their wanted values
+        """
+        self.operation = operation
+        self.group = group
+        self.first_year = first_year
+        self.last_year = last_year
+        self.filters = filters or {}
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Parse the options from the query string of a request
+
+        :param args: query string arguments of the request
+        :return: the parsed options
+        :raises ValueError: If any of the options is invalid, the message of the error describes the invalid option
+        """
+        operation = args.get('op', 'sum')
+        if operation not in AGGREGATE_OPERATIONS:
+            raise ValueError('Invalid op')
+
+        group = args.get('group') or None
+        if group is not None and group not in AGGREGATE_GROUP_COLUMNS:
+            raise ValueError('Invalid group')
+
+        years = parse_projection(years=args['years']) if args.get('years') else None
+        first_year, last_year = (years.first_year, years.last_year) if years is not None else (None, None)
 
-from app.data_source import DataLevel, DataSourceException, BaseDataSource
+        filters = {column: args[parameter] for parameter, column in FILTER_PARAMETERS.items() if args.get(parameter)}
+
+        return cls(operation, group, first_year, last_year, filters)
+
+    def cache_key(self) -> tuple:
+        """Hashable representation of the options, used as a part of the key of the cached responses"""
+        return ('aggregate', self.operation, self.group, self.first_year, self.last_year,
+                tuple(sorted(self.filters.items())))
+
+
+class SeriesRequestOptions:
+    def __init__(self, key_column: str = 'EU-Code', first_year: int = None, last_year: int = None,
+                 compact: bool = False):
+        """
+        Options of a series request that are given in its query string
+
+        :param key_column: column that identifies the requested regions, one of `SERIES_KEY_COLUMNS`
+        :param first_year: first year column to return, starts with the earliest year if not provided
+        :param last_year: last year column to return, ends with the latest year if not provided
+        :param compact: whether to return the values of the years as a matrix instead of a record per region
+        """
+        self.key_column = key_column
+        self.first_year = first_year
+        self.last_year = last_year
+        self.compact = compact
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Parse the options from the query string of a request
+
+        :param args: query string arguments of the request
+        :return: the parsed options
+        :raises ValueError: If any of the options is invalid, the message of the error describes the invalid option
+        """
+        key_column = FILTER_PARAMETERS.get(args.get('key', 'eu_code'))
+        if key_column not in SERIES_KEY_COLUMNS:
+            raise ValueError('Invalid key')
+
+        years = parse_projection(years=args['years']) if args.get('years') else None
+        first_year, last_year = (years.first_year, years.last_year) if years is not None else (None, None)
+
+        compact = args.get('compact', 'false')
+        if compact not in ('true', 'false'):
+            raise ValueError('Invalid compact')
+
+        return cls(key_column, first_year, last_year, compact == 'true')
+
+    def cache_key(self) -> tuple:
+        """Hashable representation of the options, used as a part of the key of the cached responses"""
+        return 'series', self.key_column, self.first_year, self.last_year, self.compact
 
 
 class GenericDataResource(Resource):
-    def __init__(self, data_source: BaseDataSource, table_name: str, data_description: str):
+    def __init__(self, data_source: BaseDataSource, table_name: str, data_description: str,
+                 response_cache: ResponseCache = None, compressor: Compressor = None):
         """
         A helper class that automatically generates get data and get metadata APIs for the given data source
 
         :param data_source: data source object to get the data from
         :param table_name: name of the table on the data source to get the data from
         :param data_description:
+        :param response_cache: cache to store the serialized responses in, responses are not cached if not provided
+        :param compressor: compressor of the data responses, responses are not compressed if not provided
         """
         self.data_source = data_source
         self.table_name = table_name
         self.data_description = data_description
+        self.response_cache = response_cache
+        self.compressor = compressor
+
+    @staticmethod
+    def handle_data_request(get_data_func, table_name, data_level, response_cache: ResponseCache = None,
+                            version=None, options: DataRequestOptions = None, compressor: Compressor = None,
+                            accept_encoding: str = None):
+        """
+        Fetch data for a specific level
+
+        If a limit is given, the response contains a `next_cursor` field that points to the next page (or is null on the
+        last page). One row more than the limit is requested from the data source to know whether a next page exists.
+
+        Successful responses are cached by the version of the data source, the table, the data level and the output
+        options, so cache hits skip pandas entirely. Nothing is cached if the version of the data source is unknown.
+
+        If a compressor is given, the body is compressed with the encoding negotiated from the Accept-Encoding header.
+        The compressed variants are cached next to the uncompressed body, so each of them is only compressed once.
+
+        The data is returned as JSON unless another format of `DATA_FORMATS` is requested, see `serialize_data`.
+        """
+        options = options or DataRequestOptions()
+        cache_key = (version, table_name, data_level, options.cache_key())
+        use_cache = response_cache is not None and version is not None
+        encoding = None
+        if compressor is not None and options.data_format not in COMPRESSED_FORMATS:
+            encoding = compressor.negotiate(accept_encoding)
+        if use_cache:
+            response = GenericDataResource.get_cached_response(response_cache, cache_key, compressor, encoding,
+                                                               options.data_format)
+            if response is not None:
+                return response
+
+        try:
+            level = DataLevel(data_level)
+            data = get_data_func(table_name, level, **GenericDataResource.get_data_arguments(options))
+            body = GenericDataResource.serialize_data(data, options)
+        except ValueError:
+            return {'status': 'error', 'message': 'Invalid data level'}, 400
+        except InvalidQueryException as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        except DataSourceException as e:
+            return {'status': 'error', 'message': str(e)}, 500
+
+        if use_cache:
+            response_cache.put(cache_key, body)
+        return GenericDataResource.make_data_response(body, compressor, encoding, response_cache if use_cache else None,
+                                                      cache_key, data_format=options.data_format)
+
+    @staticmethod
+    async def ahandle_data_request(aget_data_func, table_name, data_level, response_cache: ResponseCache = None,
+                                   version=None, options: DataRequestOptions = None, compressor: Compressor = None,
+                                   accept_encoding: str = None):
+        """
+        Async counterpart of `handle_data_request`, fetches the data with an async function of the data source
+        """
+        options = options or DataRequestOptions()
+        cache_key = (version, table_name, data_level, options.cache_key())
+        use_cache = response_cache is not None and version is not None
+        encoding = None
+        if compressor is not None and options.data_format not in COMPRESSED_FORMATS:
+            encoding = compressor.negotiate(accept_encoding)
+        if use_cache:
+            response = GenericDataResource.get_cached_response(response_cache, cache_key, compressor, encoding,
+                                                               options.data_format)
+            if response is not None:
+                return response
+
+        try:
+            level = DataLevel(data_level)
+            data = await aget_data_func(table_name, level, **GenericDataResource.get_data_arguments(options))
+            body = GenericDataResource.serialize_data(data, options)
+        except ValueError:
+            return {'status': 'error', 'message': 'Invalid data level'}, 400
+        except InvalidQueryException as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        except DataSourceException as e:
+            return {'status': 'error', 'message': str(e)}, 500
+
+        if use_cache:
+            response_cache.put(cache_key, body)
+        return GenericDataResource.make_data_response(body, compressor, encoding, response_cache if use_cache else None,
+                                                      cache_key, data_format=options.data_format)
+
+    @staticmethod
+    def handle_aggregate_request(aggregate_func, table_name, data_level, response_cache: ResponseCache = None,
+                                 version=None, options: AggregateRequestOptions = None, compressor: Compressor = None,
+                                 accept_encoding: str = None):
+        """
+        Aggregate the year columns of a specific level
+
+        The responses are memoized in the response cache like the ones of `handle_data_request`, so each set of
+        parameters is only aggregated once per version of the data source.
+        """
+        options = options or AggregateRequestOptions()
+        cache_key = (version, table_name, data_level, options.cache_key())
+        use_cache = response_cache is not None and version is not None
+        encoding = compressor.negotiate(accept_encoding) if compressor is not None else None
+        if use_cache:
+            response = GenericDataResource.get_cached_response(response_cache, cache_key, compressor, encoding)
+            if response is not None:
+                return response
+
+        try:
+            level = DataLevel(data_level)
+            data = aggregate_func(table_name, level, options.operation, group=options.group,
+                                  first_year=options.first_year, last_year=options.last_year, filters=options.filters)
+            body = serialize_data_response(data, extra_fields={'op': options.operation, 'group': options.group})
+        except ValueError:
+            return {'status': 'error', 'message': 'Invalid data level'}, 400
+        except InvalidQueryException as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        except DataSourceException as e:
+            return {'status': 'error', 'message': str(e)}, 500
+
+        if use_cache:
+            response_cache.put(cache_key, body)
+        return GenericDataResource.make_data_response(body, compressor, encoding, response_cache if use_cache else None,
+                                                      cache_key)
 
     @staticmethod
-    def handle_data_request(get_data_func, table_name, data_level):
-        """Fetch data for a specific level"""
+    def handle_series_request(get_series_func, table_name, keys: list, response_cache: ResponseCache = None,
+                              version=None, options: SeriesRequestOptions = None, compressor: Compressor = None,
+                              accept_encoding: str = None):
+        """
+        Fetch the time series of the given regions
+
+        Regions that aren't found are listed in the `missing` field of the response, the response has the status 404 if
+        none of the regions are found.
+        """
+        options = options or SeriesRequestOptions()
+        cache_key = (version, table_name, tuple(keys), options.cache_key())
+        use_cache = response_cache is not None and version is not None
+        encoding = compressor.negotiate(accept_encoding) if compressor is not None else None
+        if use_cache:
+            response = GenericDataResource.get_cached_response(response_cache, cache_key, compressor, encoding)
+            if response is not None:
+                return response
+
+        try:
+            data = get_series_func(table_name, keys, options.key_column, first_year=options.first_year,
+                                   last_year=options.last_year)
+        except InvalidQueryException as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        except DataSourceException as e:
+            return {'status': 'error', 'message': str(e)}, 500
+        if data.empty:
+            return {'status': 'error', 'message': f"Unknown regions: {', '.join(keys)}"}, 404
+
+        body = serialize_series_response(data, options.key_column, keys, options.compact)
+        if use_cache:
+            response_cache.put(cache_key, body)
+        return GenericDataResource.make_data_response(body, compressor, encoding, response_cache if use_cache else None,
+                                                      cache_key)
+
+    @staticmethod
+    def handle_stream_request(iter_data_func, table_name, data_level, options: DataRequestOptions,
+                              chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Stream the data of a specific level chunk by chunk
+
+        The first chunk is fetched before the response is created, so errors of the data source are still answered
+        with an error response. Streamed responses are neither cached nor compressed.
+        """
         try:
             level = DataLevel(data_level)
-            data = get_data_func(table_name, level)
-            return ({'status': 'success',
-                     'data': data.drop(columns=['NUTS 1', 'NUTS 2', 'NUTS 3']).to_json(orient='records')},
-                    200)
+            chunks = iter_data_func(table_name, level, chunk_size=chunk_size, after=options.after,
+                                    projection=options.projection, filters=options.filters)
+            first_chunk = next(chunks)
         except ValueError:
             return {'status': 'error', 'message': 'Invalid data level'}, 400
+        except InvalidQueryException as e:
+            return {'status': 'error', 'message': str(e)}, 400
         except DataSourceException as e:
             return {'status': 'error', 'message': str(e)}, 500
 
+        response = Response(serialize_data_chunks(itertools.chain([first_chunk], chunks), options.data_format),
+                            mimetype=DATA_FORMATS[options.data_format])
+        response.vary.add('Accept')
+        return response
+
+    @staticmethod
+    def get_cached_response(response_cache: ResponseCache, cache_key, compressor: Compressor = None,
+                            encoding: str = None, data_format: str = 'json'):
+        """
+        Create the response of a cached body, prefers the cached variant compressed with the given encoding
+
+        :return: the created response, or None if the body isn't cached
+        """
+        if encoding is not None:
+            compressed_body = response_cache.get((*cache_key, encoding))
+            if compressed_body is not None:
+                return GenericDataResource.make_data_response(compressed_body, compressor, encoding, compressed=True,
+                                                              data_format=data_format)
+
+        body = response_cache.get(cache_key)
+        if body is None:
+            return None
+        return GenericDataResource.make_data_response(body, compressor, encoding, response_cache, cache_key,
+                                                      data_format=data_format)
+
+    @staticmethod
+    def make_data_response(body: bytes, compressor: Compressor = None, encoding: str = None,
+                           response_cache: ResponseCache = None, cache_key=None, compressed: bool = False,
+                           data_format: str = 'json'):
+        """
+        Create the response of a serialized data body, compressed with the negotiated encoding if it is large enough
+
+        :param body: serialized body
+        :param compressor: compressor of the data responses, the body is sent as it is if not provided
+        :param encoding: negotiated content encoding, the body is sent as it is if not provided
+        :param response_cache: cache to store the compressed body in, it is not stored if not provided
+        :param cache_key: cache key of the uncompressed body
+        :param compressed: whether the body is already compressed with the given encoding
+        :param data_format: format of the body, one of `DATA_FORMATS`
+        :return: the created response
+        """
+        if not compressed and encoding is not None and compressor.should_compress(body):
+            body = compressor.compress(body, encoding)
+            if response_cache is not None:
+                response_cache.put((*cache_key, encoding), body)
+            compressed = True
+
+        response = make_json_response(body, encoding=encoding if compressed else None,
+                                      mimetype=DATA_FORMATS[data_format])
+        response.vary.add('Accept')
+        if compressor is not None:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    @staticmethod
+    def get_data_arguments(options: DataRequestOptions) -> dict:
+        """
+        Keyword arguments of the data source's get data functions for the given request options
+
+        If a limit is given, one row more than the limit is requested to know whether a next page exists.
+        """
+        limit = None if options.limit is None else options.limit + 1
+        return {'after': options.after, 'limit': limit, 'projection': options.projection, 'filters': options.filters}
+
+    @staticmethod
+    def serialize_data(data: pd.DataFrame, options: DataRequestOptions) -> bytes:
+        """
+        Serialize the data fetched with the arguments of `get_data_arguments` to the body of the response
+
+        If a limit is given, the extra row is dropped and the body contains the `next_cursor` of the next page. The
+        columnar formats store the cursor in their schema metadata, where it is missing on the last page.
+        """
+        extra_fields = None
+        if options.limit is not None:
+            next_cursor = None
+            if len(data) > options.limit:
+                data = data.iloc[:options.limit]
+                next_cursor = encode_cursor(data[KEY_COLUMN].iloc[-1])
+            extra_fields = {'next_cursor': next_cursor}
+
+        data = data.drop(columns=['NUTS 1', 'NUTS 2', 'NUTS 3'], errors='ignore')
+        if options.data_format != 'json':
+            return serialize_data_table(data, options.data_format, extra_fields)
+        return serialize_data_response(data, options.payload, extra_fields)
+
     @staticmethod
     def handle_metadata_request(get_metadata_func, table_name):
         """Fetch metadata"""
@@ -40,6 +733,15 @@ class GenericDataResource(Resource):
         except DataSourceException as e:
             return {'status': 'error', 'message': str(e)}, 500
 
+    @staticmethod
+    async def ahandle_metadata_request(aget_metadata_func, table_name):
+        """Async counterpart of `handle_metadata_request`"""
+        try:
+            metadata = (await aget_metadata_func(table_name)).to_json()
+            return {'status': 'success', 'metadata': metadata}, 200
+        except DataSourceException as e:
+            return {'status': 'error', 'message': str(e)}, 500
+
     def get(self, data_level):
         """
         Fetch data for a specific level from this table
@@ -51,6 +753,64 @@ class GenericDataResource(Resource):
             required: true
             description: The data level (1, 2, 3)
             default: "1"
+          - name: payload
+            in: query
+            type: string
+            required: false
+            enum: [array, string]
+            description: Shape of the data field, 'string' returns the records as a JSON string for legacy clients
+          - name: format
+            in: query
+            type: string
+            required: false
+            enum: [json, arrow, parquet, csv, ndjson]
+            description: Format of the response, takes precedence over the Accept header (csv doesn't support limit)
+          - name: stream
+            in: query
+            type: boolean
+            required: false
+            description: Stream the records chunk by chunk as ndjson, csv or arrow (always true for ndjson)
+          - name: limit
+            in: query
+            type: integer
+            required: false
+            description: Maximum number of records to return, enables the pagination
+          - name: cursor
+            in: query
+            type: string
+            required: false
+            description: Cursor of the page to return, taken from the next_cursor field of the previous page
+          - name: columns
+            in: query
+            type: string
+            required: false
+            description: Comma separated names of the non-year columns to return (Lfd. Nr. is always returned)
+          - name: years
+            in: query
+            type: string
+            required: false
+            description: A single year or a range of year columns to return, e.g. 2015..2021, 2015.. or ..2000
+          - name: land
+            in: query
+            type: string
+            required: false
+            description: Only return the records of this Land (e.g. BW)
+          - name: eu_code
+            in: query
+            type: string
+            required: false
+            description: Only return the record with this EU-Code (e.g. DE11)
+          - name: regionalschluessel
+            in: query
+            type: string
+            required: false
+            description: Only return the records whose Regional-schlüssel starts with this prefix (e.g. 08)
+        produces:
+          - application/json
+          - application/vnd.apache.arrow.stream
+          - application/vnd.apache.parquet
+          - text/csv
+          - application/x-ndjson
         responses:
           200:
             description: Data retrieved successfully
@@ -59,140 +819,16 @@ class GenericDataResource(Resource):
                 status:
                   type: string
                   default: success
+                next_cursor:
+                  type: string
+                  description: Cursor of the next page, only present if a limit is given and null on the last page
                 data:
                   type: array
+                  description: Records of the table, their schema is generated from the columns of the table
                   items:
                     type: object
-                    properties:
-                      Lfd. Nr.:
-                        type: integer
-                        description: 'Lfd. Nr.'
-                      EU-Code:
-                        type: string
-                        description: 'EU-Code'
-                      Regional-schlüssel:
-                        type: string
-                        description: 'Regional-schlüssel'
-                      Land:
-                        type: string
-                        description: 'Land'
-                      Gebietseinheit:
-                        type: string
-                        description: 'Gebietseinheit'
-                      '1992':
-                        type: number
-                        description: '1992'
-                        format: float
-                      '1994':
-                        type: number
-                        description: '1994'
-                        format: float
-                      '1995':
-                        type: number
-                        description: '1995'
-                        format: float
-                      '1996':
-                        type: number
-                        description: '1996'
-                        format: float
-                      '1997':
-                        type: number
-                        description: '1997'
-                        format: float
-                      '1998':
-                        type: number
-                        description: '1998'
-                        format: float
-                      '1999':
-                        type: number
-                        description: '1999'
-                        format: float
-                      '2000':
-                        type: number
-                        description: '2000'
-                        format: float
-                      '2001':
-                        type: number
-                        description: '2001'
-                        format: float
-                      '2002':
-                        type: number
-                        description: '2002'
-                        format: float
-                      '2003':
-                        type: number
-                        description: '2003'
-                        format: float
-                      '2004':
-                        type: number
-                        description: '2004'
-                        format: float
-                      '2005':
-                        type: number
-                        description: '2005'
-                        format: float
-                      '2006':
-                        type: number
-                        description: '2006'
-                        format: float
-                      '2008':
-                        type: number
-                        description: '2008'
-                        format: float
-                      '2009':
-                        type: number
-                        description: '2009'
-                        format: float
-                      '2010':
-                        type: number
-                        description: '2010'
-                        format: float
-                      '2011':
-                        type: number
-                        description: '2011'
-                        format: float
-                      '2012':
-                        type: number
-                        description: '2012'
-                        format: float
-                      '2013':
-                        type: number
-                        description: '2013'
-                        format: float
-                      '2014':
-                        type: number
-                        description: '2014'
-                        format: float
-                      '2015':
-                        type: number
-                        description: '2015'
-                        format: float
-                      '2016':
-                        type: number
-                        description: '2016'
-                        format: float
-                      '2017':
-                        type: number
-                        description: '2017'
-                        format: float
-                      '2018':
-                        type: number
-                        description: '2018'
-                        format: float
-                      '2019':
-                        type: number
-                        description: '2019'
-                        format: float
-                      '2020':
-                        type: number
-                        description: '2020'
-                        format: float
-                      '2021':
-                        type: number
-                        description: '2021'
-                        format: float
           400:
-            description: Invalid data level
+            description: Invalid data level or query parameter
             schema:
               properties:
                 status:
@@ -212,7 +848,191 @@ class GenericDataResource(Resource):
                   type: string
                   default: An error occurred
         """
-        return GenericDataResource.handle_data_request(self.data_source.get_data, self.table_name, data_level)
+        try:
+            options = DataRequestOptions.from_args(request.args, current_app.config.get('data_payload', 'array'),
+                                                   request.headers.get('Accept'))
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        if options.stream:
+            return GenericDataResource.handle_stream_request(self.data_source.iter_data, self.table_name, data_level,
+                                                             options, current_app.config['stream_chunk_size'])
+        return GenericDataResource.handle_data_request(self.data_source.get_data, self.table_name, data_level,
+                                                       self.response_cache, self.data_source.version, options,
+                                                       self.compressor, request.headers.get('Accept-Encoding'))
+
+    def get_aggregate(self, data_level):
+        """
+        Aggregate the year columns of a specific level of this table
+        ---
+        parameters:
+          - name: data_level
+            in: path
+            type: string
+            required: true
+            description: The data level (1, 2, 3)
+            default: "1"
+          - name: op
+            in: query
+            type: string
+            required: false
+            enum: [sum, mean, min, max, growth]
+            default: sum
+            description: Aggregate operation, growth is the year-over-year growth rate of the sums
+          - name: group
+            in: query
+            type: string
+            required: false
+            enum: [Land]
+            description: Column to group the records by, aggregates all the records of the level if not given
+          - name: years
+            in: query
+            type: string
+            required: false
+            description: A single year or a range of year columns to aggregate, e.g. 2015..2021, 2015.. or ..2000
+          - name: land
+            in: query
+            type: string
+            required: false
+            description: Only aggregate the records of this Land (e.g. BW)
+          - name: eu_code
+            in: query
+            type: string
+            required: false
+            description: Only aggregate the record with this EU-Code (e.g. DE11)
+          - name: regionalschluessel
+            in: query
+            type: string
+            required: false
+            description: Only aggregate the records whose Regional-schlüssel starts with this prefix (e.g. 08)
+        responses:
+          200:
+            description: Data aggregated successfully
+            schema:
+              properties:
+                status:
+                  type: string
+                  default: success
+                data:
+                  type: array
+                  description: One record per group with the group column and the aggregated year columns
+                  items:
+                    type: object
+                op:
+                  type: string
+                  example: mean
+                group:
+                  type: string
+                  example: Land
+          400:
+            description: Invalid data level or options
+            schema:
+              properties:
+                status:
+                  type: string
+                  default: error
+                message:
+                  type: string
+                  default: Invalid op
+          500:
+            description: Internal Server Error
+            schema:
+              properties:
+                status:
+                  type: string
+                  default: error
+                message:
+                  type: string
+                  default: An error occurred
+        """
+        try:
+            options = AggregateRequestOptions.from_args(request.args)
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        return GenericDataResource.handle_aggregate_request(self.data_source.aggregate, self.table_name, data_level,
+                                                            self.response_cache, self.data_source.version, options,
+                                                            self.compressor, request.headers.get('Accept-Encoding'))
+
+    def get_series(self, keys):
+        """
+        Fetch the time series of one or more regions of this table, regardless of their data level
+        ---
+        parameters:
+          - name: keys
+            in: path
+            type: string
+            required: true
+            description: Comma separated EU-Codes (or Regional-schlüssel, see key) of the regions
+            default: "DE1"
+          - name: key
+            in: query
+            type: string
+            required: false
+            enum: [eu_code, regionalschluessel]
+            default: eu_code
+            description: Column that identifies the regions
+          - name: years
+            in: query
+            type: string
+            required: false
+            description: A single year or a range of year columns to return, e.g. 2015..2021, 2015.. or ..2000
+          - name: compact
+            in: query
+            type: boolean
+            required: false
+            description: Return the values as a matrix with a row per region and a column per year
+        responses:
+          200:
+            description: Series retrieved successfully
+            schema:
+              properties:
+                status:
+                  type: string
+                  default: success
+                data:
+                  type: array
+                  description: One record per found region (not compact)
+                  items:
+                    type: object
+                years:
+                  type: array
+                  description: Years of the columns of the values (compact)
+                  items:
+                    type: integer
+                regions:
+                  type: array
+                  description: Keys of the rows of the values (compact)
+                  items:
+                    type: string
+                values:
+                  type: array
+                  description: Values of the found regions (compact)
+                  items:
+                    type: array
+                    items:
+                      type: number
+                key:
+                  type: string
+                  example: EU-Code
+                missing:
+                  type: array
+                  description: Requested regions that weren't found
+                  items:
+                    type: string
+          400:
+            description: Invalid options
+          404:
+            description: None of the regions were found
+          500:
+            description: Internal Server Error
+        """
+        try:
+            options = SeriesRequestOptions.from_args(request.args)
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        keys = list(dict.fromkeys(key.strip() for key in keys.split(',') if key.strip()))
+        return GenericDataResource.handle_series_request(self.data_source.get_series, self.table_name, keys,
+                                                         self.response_cache, self.data_source.version, options,
+                                                         self.compressor, request.headers.get('Accept-Encoding'))
 
     def get_metadata(self):
         """
@@ -253,7 +1073,181 @@ class GenericDataResource(Resource):
         return GenericDataResource.handle_metadata_request(self.data_source.get_metadata, self.table_name)
 
 
-def add_resource_to_api(api, resource_name, table_name, data_source):
+class BatchRequestHandler:
+    def __init__(self, resources: dict, max_requests: int = 100, max_workers: int = None,
+                 compressor: Compressor = None):
+        """
+        Handler of batch requests that answer several data and metadata requests in a single response
+
+        :param resources: maps the lower case names of the resources to their `GenericDataResource`
+        :param max_requests: maximum number of the requests in a batch
+        :param max_workers: number of threads that run the requests of the batches, uses the executor's default if None
+        :param compressor: compressor of the batch responses, responses are not compressed if not provided
+        """
+        self.resources = resources
+        self.max_requests = max_requests
+        self.max_workers = max_workers
+        self.compressor = compressor
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool that runs the requests of the batches, created on its first usage in every process"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch')
+        return self._executor
+
+    def after_fork(self):
+        """
+        Reset the executor in a forked child process, called in every worker of the pre-fork server, since the threads
+        of the executor of the parent don't exist in the child
+        """
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @staticmethod
+    def get_request_key(spec) -> tuple:
+        """
+        Normalize the spec of a request of a batch, identical requests have the same key
+
+        :param spec: dictionary containing the resource, the level (a data level or 'metadata') and the (optional) query
+            string options of the request
+        :return: hashable key of the request
+        :raises ValueError: If the spec is invalid
+        """
+        if not isinstance(spec, dict) or not isinstance(spec.get('resource'), str) or 'level' not in spec:
+            raise ValueError('Invalid request, resource and level are required')
+        options = spec.get('options') or {}
+        if not isinstance(options, dict):
+            raise ValueError('Invalid request, options must be an object')
+
+        # the options are given as JSON values but parsed like query string parameters, null options are omitted
+        query_options = []
+        for name, value in options.items():
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = 'true' if value else 'false'
+            elif not isinstance(value, (str, int, float)):
+                raise ValueError(f'Invalid request, option {name} must be a string, number or boolean')
+            query_options.append((str(name), str(value)))
+        return spec['resource'].lower(), str(spec['level']), tuple(sorted(query_options))
+
+    def run_request(self, request_key: tuple, default_payload: str = 'array') -> tuple:
+        """
+        Run a single request of a batch
+
+        :param request_key: key of the request created by `get_request_key`
+        :param default_payload: payload to use if it's not specified in the options of the request
+        :return: tuple containing the status and the serialized JSON body of the response
+        """
+        resource_name, level, options = request_key
+        resource = self.resources.get(resource_name)
+        if resource is None:
+            result = {'status': 'error', 'message': f'Unknown resource: {resource_name}'}, 404
+        elif level == 'metadata':
+            result = GenericDataResource.handle_metadata_request(resource.data_source.get_metadata, resource.table_name)
+        else:
+            try:
+                data_options = DataRequestOptions.from_args(MultiDict(options), default_payload)
+                if data_options.data_format != 'json' or data_options.stream:
+                    raise ValueError('Only JSON responses are supported by batch requests')
+            except ValueError as e:
+                result = {'status': 'error', 'message': str(e)}, 400
+            else:
+                result = GenericDataResource.handle_data_request(
+                    resource.data_source.get_data, resource.table_name, level, resource.response_cache,
+                    resource.data_source.version, data_options)
+
+        if isinstance(result, tuple):
+            return result[1], json.dumps(result[0]).encode()
+        return result.status_code, result.get_data()
+
+    def post(self):
+        """
+        Answer several data and metadata requests in a single response
+        ---
+        parameters:
+          - name: body
+            in: body
+            required: true
+            schema:
+              properties:
+                requests:
+                  type: array
+                  description: The requests, level is a data level (1, 2, 3) or metadata and options contains the query
+                    parameters of the data endpoint
+                  items:
+                    type: object
+                    properties:
+                      resource:
+                        type: string
+                        example: erwerbstaefige
+                      level:
+                        type: string
+                        example: "3"
+                      options:
+                        type: object
+                        example: {"limit": 10, "land": "BW"}
+        responses:
+          200:
+            description: Results of the requests in the order of the requests
+            schema:
+              properties:
+                status:
+                  type: string
+                  default: success
+                results:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      status:
+                        type: integer
+                        example: 200
+                      body:
+                        type: object
+                        description: Body of the response of the request
+          400:
+            description: Invalid batch
+            schema:
+              properties:
+                status:
+                  type: string
+                  default: error
+                message:
+                  type: string
+                  default: Invalid batch
+        """
+        batch = request.get_json(silent=True)
+        specs = batch.get('requests') if isinstance(batch, dict) else None
+        if not isinstance(specs, list):
+            return {'status': 'error', 'message': 'Invalid batch, requests must be an array'}, 400
+        if len(specs) > self.max_requests:
+            return {'status': 'error', 'message': f'Too many requests, at most {self.max_requests} are allowed'}, 400
+        try:
+            request_keys = [self.get_request_key(spec) for spec in specs]
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
+
+        # identical requests are only run once, the independent ones concurrently
+        default_payload = current_app.config.get('data_payload', 'array')
+        futures = {request_key: self.executor.submit(self.run_request, request_key, default_payload)
+                   for request_key in dict.fromkeys(request_keys)}
+        results = [b'{"status": %d, "body": %s}' % futures[request_key].result() for request_key in request_keys]
+
+        body = b'{"status": "success", "results": [' + b', '.join(results) + b']}'
+        encoding = None
+        if self.compressor is not None:
+            encoding = self.compressor.negotiate(request.headers.get('Accept-Encoding'))
+        return GenericDataResource.make_data_response(body, self.compressor, encoding)
+
+
+def add_resource_to_api(api, resource_name, table_name, data_source, response_cache: ResponseCache = None,
+                        compressor: Compressor = None):
     """
     Helper function to create and add resource and its metadata to the API.
 
@@ -261,9 +1255,12 @@ def add_resource_to_api(api, resource_name, table_name, data_source):
     :param resource_name: The name of the resource
     :param table_name: The name of the table to get the resources from
     :param data_source: Data source to get the data from
+    :param response_cache: Cache to store the serialized responses in, responses are not cached if not provided
+    :param compressor: Compressor of the data responses, responses are not compressed if not provided
+    :return: The created resource
     """
     resource_instance = GenericDataResource(
-        data_source, table_name, "Bruftoinlandsprodukt data"
+        data_source, table_name, "Bruftoinlandsprodukt data", response_cache, compressor
     )
 
     resource_class = type(resource_name, (Resource,), {'get': resource_instance.get})
@@ -272,12 +1269,25 @@ def add_resource_to_api(api, resource_name, table_name, data_source):
     metadata_class = type(f'{resource_name}Metadata', (Resource,), {'get': resource_instance.get_metadata})
     api.add_resource(metadata_class, f'/{resource_name.lower()}/metadata')
 
+    aggregate_class = type(f'{resource_name}Aggregate', (Resource,), {'get': resource_instance.get_aggregate})
+    api.add_resource(aggregate_class, f'/{resource_name.lower()}/<string:data_level>/aggregate')
+
+    series_class = type(f'{resource_name}Series', (Resource,), {'get': resource_instance.get_series})
+    api.add_resource(series_class, f'/{resource_name.lower()}/series/<string:keys>')
 
-def create_data_blueprint(data_source):
+    return resource_instance
+
+
+def create_data_blueprint(data_source, response_cache: ResponseCache = None, compressor: Compressor = None,
+                          batch_max_requests: int = 100, batch_max_workers: int = None):
     """
     Helper function to generate a data blueprint that contains the API for accessing the data
 
     :param data_source: Data source to get the data from
+    :param response_cache: Cache to store the serialized responses in, responses are not cached if not provided
+    :param compressor: Compressor of the data responses, responses are not compressed if not provided
+    :param batch_max_requests: Maximum number of the requests in a batch request
+    :param batch_max_workers: Number of threads that run the requests of the batches, uses the executor's default if None
     :return: Generated blueprint
     """
     data_bp = Blueprint('data', __name__)
@@ -291,60 +1301,141 @@ def create_data_blueprint(data_source):
     api = Api(data_bp)
 
     # Create resource instances for different endpoints and add them to the API
-    add_resource_to_api(api, 'Bruftoinlandsprodukt_in_jeweiligen_Preisen', '1.1', data_source)
-    add_resource_to_api(api, 'Erwerbstaefige', '3.1', data_source)
+    resources = {}
+    for resource_name, table_name in DATA_TABLES.items():
+        resources[resource_name.lower()] = add_resource_to_api(api, resource_name, table_name, data_source,
+                                                               response_cache, compressor)
+
+    batch_handler = BatchRequestHandler(resources, batch_max_requests, batch_max_workers, compressor)
+    api.add_resource(type('Batch', (Resource,), {'post': batch_handler.post}), '/batch')
+
+    @data_bp.record_once
+    def register_batch_handler(state):
+        # the pre-fork server resets the executor of the batch handler in every worker
+        state.app.extensions['batch_handler'] = batch_handler
 
     return data_bp
 
 
-def create_home_blueprint(api_url, swagger_url):
+def create_health_blueprint(warm_up):
+    """
+    Helper function to generate a blueprint that allows load balancers to check the health of the app
+
+    :param warm_up: Warm-up of the data source, the app is only reported as ready after it is finished
+    :return: Generated blueprint
     """
-    Helper function that dynamically generates the webapp blueprint for homepage which contains info about the data blueprint
+    health_bp = Blueprint('health', __name__)
+
+    @health_bp.route('/live')
+    def live():
+        """Liveness probe, succeeds as long as the app is able to handle requests."""
+        return jsonify({'status': 'alive'}), 200
+
+    @health_bp.route('/ready')
+    def ready():
+        """Readiness probe, only succeeds after the data source is warmed up."""
+        if warm_up.failed:
+            return jsonify({'status': 'error', 'message': 'Warm-up failed'}), 503
+        if not warm_up.is_ready:
+            return jsonify({'status': 'warming_up'}), 503
+        return jsonify({'status': 'ready'}), 200
 
-    Please note that this function should be called after registering other blueprints.
+    @health_bp.route('/memory')
+    def memory():
+        """Memory used by the tables that the data source keeps in memory, tables that aren't loaded are null."""
+        tables = {table_name: warm_up.data_source.memory_usage(table_name) for table_name in warm_up.table_names}
+        total = sum(report['bytes'] for report in tables.values() if report is not None)
+        return jsonify({'status': 'success', 'bytes': total, 'tables': tables}), 200
 
+    return health_bp
+
+
+class EndpointDirectory:
+    def __init__(self, url_map, api_spec_url: str, swagger_url: str):
+        """
+        Directory of the data endpoints, computed once from the url map after the data blueprint is registered
+
+        The urls are relative to the root of the app and the version is a hash of the directory, so it only changes
+        when the registered endpoints change.
+
+        :param url_map: url map of the app
+        :param api_spec_url: url on which the api spec is served
+        :param swagger_url: url on which swagger is served
+        """
+        adapter = url_map.bind('localhost')
+        endpoints = {}
+        for rule in url_map.iter_rules():
+            if not rule.endpoint.startswith('data.'):
+                continue
+            endpoint_name = rule.endpoint.split('.')[-1]
+            if endpoint_name.endswith('metadata') and not rule.arguments:
+                endpoints.setdefault(endpoint_name[:-len('metadata')], {})['metadata'] = adapter.build(rule.endpoint)
+            elif rule.arguments == {'data_level'} and not rule.rule.endswith('/aggregate'):
+                endpoints.setdefault(endpoint_name, {})['data'] = {
+                    level.value: adapter.build(rule.endpoint, {'data_level': level.value}) for level in DataLevel}
+
+        self.endpoints = endpoints
+        self.api_spec_url = api_spec_url
+        self.swagger_url = swagger_url
+        directory = {'endpoints': endpoints, 'swagger_url': swagger_url, 'api_spec': api_spec_url}
+        self.version = hashlib.sha256(json.dumps(directory, sort_keys=True).encode()).hexdigest()[:16]
+        self.body = json.dumps({'status': 'success', 'version': self.version, **directory}).encode()
+
+    def get_api_info(self, url_root: str) -> dict:
+        """
+        Get the directory with absolute urls for the home page
+
+        :param url_root: root url of the app, taken from the request
+        :return: the directory in the shape expected by the home.html template
+        """
+        url_root = url_root.rstrip('/')
+        endpoints = {}
+        for name, urls in self.endpoints.items():
+            endpoints[name] = {}
+            if 'data' in urls:
+                endpoints[name]['data'] = {int(level): url_root + url for level, url in urls['data'].items()}
+            if 'metadata' in urls:
+                endpoints[name]['metadata'] = url_root + urls['metadata']
+        return {
+            'message': 'Welcome to the Data API!',
+            'endpoints': endpoints,
+            'swagger_url': url_root + self.swagger_url,
+            'api_spec': url_root + self.api_spec_url,
+        }
+
+
+def create_home_blueprint(api_url, swagger_url, endpoint_directory: EndpointDirectory = None):
+    """
+    Helper function that generates the webapp blueprint for homepage which contains info about the data blueprint
+
+    The endpoint directory is computed once, if it isn't given it's computed on the first request, so this function
+    should be called after registering other blueprints.
+
+    :param api_url: url on which api spec is served
+    :param swagger_url: url on which swagger is served
+    :param endpoint_directory: precomputed directory of the data endpoints
     :return: Generated blueprint
     """
     home_bp = Blueprint('home', __name__)
 
+    def get_endpoint_directory() -> EndpointDirectory:
+        nonlocal endpoint_directory
+        if endpoint_directory is None:
+            endpoint_directory = EndpointDirectory(current_app.url_map, api_url, swagger_url)
+        return endpoint_directory
+
     @home_bp.route('/')
     def home():
         """Home route that provides information about the API endpoints."""
-        endpoints = {}
-        for rule in current_app.url_map.iter_rules():
-            if rule.endpoint.startswith('data.'):
-                endpoint_name = rule.endpoint.split('.')[-1]
-                if endpoint_name.endswith('metadata'):
-                    try:
-                        # Provide a default value for required parameters
-                        url = url_for(rule.endpoint, _external=True)
-                    except Exception as e:
-                        # If there's an error, it means we need to handle the parameters differently
-                        continue
-
-                    base_name = endpoint_name.split('metadata')[0]
-                    endpoints.setdefault(base_name, {})['metadata'] = url
-                else:
-                    try:
-                        # Create dictionary for data levels
-                        data_levels = {
-                            1: url_for(rule.endpoint, data_level='1', _external=True),
-                            2: url_for(rule.endpoint, data_level='2', _external=True),
-                            3: url_for(rule.endpoint, data_level='3', _external=True)
-                        }
-                    except Exception as e:
-                        # If there's an error, it means we need to handle the parameters differently
-                        continue
-
-                    base_name = endpoint_name.split('<')[0].split('/')[-1]
-                    endpoints.setdefault(base_name, {})['data'] = data_levels
-
-        api_info = {
-            'message': 'Welcome to the Data API!',
-            'endpoints': endpoints,
-            'swagger_url': url_for('swagger_spec', _external=True).split(api_url)[0] + swagger_url,
-            'api_spec': url_for('swagger_spec', _external=True)
-        }
-        return render_template('home.html', api_info=api_info)
+        return render_template('home.html', api_info=get_endpoint_directory().get_api_info(request.url_root))
+
+    @home_bp.route('/endpoints')
+    def endpoints():
+        """Machine-readable directory of the API endpoints, clients can revalidate it with its version as ETag."""
+        directory = get_endpoint_directory()
+        response = Response(directory.body, mimetype='application/json')
+        response.set_etag(directory.version)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
 
     return home_bp
@@ -0,0 +1,100 @@
+import argparse
+import gc
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from app import create_app
+from app.config import load_config
+
+logger = logging.getLogger(__name__)
+
+
+class PreforkServer(BaseApplication):
+    def __init__(self, flask_app, options: dict = None):
+        """
+        Gunicorn application that serves an already created Flask app with pre-forked worker processes
+
+        The app (including its loaded tables) is created in the master process before the workers are forked, so the
+        workers share the loaded tables with the master through copy-on-write instead of loading them on their own.
+
+        :param flask_app: Flask app created by `create_app`
+        :param options: gunicorn settings, e.g. `bind`, `workers`, `threads` and `timeout`
+        """
+        self.application = flask_app
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('preload_app', True)
+        self.cfg.set('post_fork', self.post_fork)
+
+    def load(self):
+        return self.application
+
+    def post_fork(self, server, worker):
+        """
+        Prepare a newly forked worker, resets the state of the data source and the batch handler that can't be shared
+        between processes
+        """
+        self.application.extensions['data_source'].after_fork()
+        self.application.extensions['batch_handler'].after_fork()
+        gc.enable()
+
+
+def get_server_options(server_config) -> dict:
+    """
+    Convert the server config to gunicorn settings
+
+    :param server_config: `server` section of the validated config
+    :return: gunicorn settings, uses one worker per CPU if the number of workers is not configured
+    """
+    return {
+        'bind': server_config['bind'],
+        'workers': server_config['workers'] or os.cpu_count() or 1,
+        'threads': server_config['threads'],
+        'timeout': server_config['timeout'],
+    }
+
+
+def serve(config_file='config/config.yaml'):
+    """
+    Load and warm up the app once in the master process and serve it with pre-forked worker processes
+
+    The garbage collector is disabled while the tables are loaded and all the loaded objects are frozen before forking,
+    so garbage collections in the workers don't write to (and thereby copy) the pages shared with the master. The
+    collector is enabled again in the master after freezing, since the frozen objects are not collected anyway.
+
+    :param config_file: path to the config file
+    """
+    gc.disable()
+    config = load_config(config_file)
+    flask_app = create_app(config_file, preload=True)
+    if not flask_app.extensions['warm_up'].is_ready:
+        logger.warning("Preloading the tables failed, the workers will load them on their own")
+
+    gc.freeze()
+    # the frozen objects are skipped by the collections, so the master can collect its own garbage again
+    gc.enable()
+    PreforkServer(flask_app, get_server_options(config['server'])).run()
+
+
+def main(args=None):
+    """
+    Entry point of the pre-fork server
+
+    Usage: `python serve.py [--config config/config.yaml]`
+
+    :param args: Command line arguments, uses the arguments of the process if not provided.
+    """
+    parser = argparse.ArgumentParser(description='Serve the app with pre-forked worker processes.')
+    parser.add_argument('--config', default='config/config.yaml', help='Path to the config file.')
+    parsed_args = parser.parse_args(args)
+    serve(parsed_args.config)
+
+
+if __name__ == '__main__':
+    main()
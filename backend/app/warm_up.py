@@ -0,0 +1,69 @@
+import logging
+import threading
+import time
+
+from app.data_source import BaseDataSource
+
+logger = logging.getLogger(__name__)
+
+
+class DataWarmUp:
+    def __init__(self, data_source: BaseDataSource, table_names, use_processes: bool = False,
+                 max_workers: int = None):
+        """
+        Preloads the tables of a data source and keeps track of whether the app is ready to serve traffic.
+
+        :param data_source: Data source to warm up.
+        :param table_names: Names of the tables to preload.
+        :param use_processes: Whether to use a process pool instead of a thread pool (if supported by the data source).
+        :param max_workers: Maximum number of the parallel workers, uses the executor's default if not provided.
+        """
+        self.data_source = data_source
+        self.table_names = list(table_names)
+        self.use_processes = use_processes
+        self.max_workers = max_workers
+        self.failed = False
+        self._ready = threading.Event()
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the warm-up is finished successfully."""
+        return self._ready.is_set()
+
+    def mark_ready(self):
+        """Mark the app as ready without preloading anything, used when the warm-up is disabled."""
+        self._ready.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Block until the warm-up is finished.
+
+        :param timeout: Maximum number of seconds to wait, waits forever if not provided.
+        :return: Whether the warm-up is finished successfully.
+        """
+        return self._ready.wait(timeout)
+
+    def run(self):
+        """Preload all the tables, marks the app as ready if successful."""
+        start_time = time.perf_counter()
+        try:
+            self.data_source.preload(self.table_names, use_processes=self.use_processes, max_workers=self.max_workers)
+        except Exception as e:
+            self.failed = True
+            logger.error(f"Warm-up of tables {self.table_names} failed: {e}")
+            return
+
+        logger.info(f"Warmed up tables {self.table_names} in {time.perf_counter() - start_time:.2f}s")
+        self._ready.set()
+
+    def start(self, background: bool = True):
+        """
+        Start the warm-up.
+
+        :param background: Whether to run the warm-up in a background thread or to block until it is finished.
+        """
+        if not background:
+            self.run()
+            return
+
+        threading.Thread(target=self.run, name='data-warm-up', daemon=True).start()
@@ -0,0 +1,5 @@
+from app.asgi import create_asgi_app
+
+# used with an ASGI server, e.g. `uvicorn asgi:app --host 0.0.0.0 --port 5000`, which can hold many concurrent
+# connections in a single process
+app = create_asgi_app()
@@ -0,0 +1,6 @@
+from app.server import main
+
+if __name__ == '__main__':
+    # production entry point, loads the data once and serves it with pre-forked worker processes (see the `server`
+    # section of the config file)
+    main()
@@ -0,0 +1,73 @@
+import asyncio
+import gzip
+import json
+import threading
+
+from app.asgi import AsgiApp
+
+
+async def call_asgi_app(asgi_app, path, query_string=b''):
+    """Send a GET request to the ASGI app and return the status and the decoded JSON body of the response"""
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'raw_path': path.encode(), 'query_string': query_string,
+             'root_path': '', 'scheme': 'http', 'server': ('localhost', 80), 'headers': [], 'http_version': '1.1'}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi_app(scope, receive, send)
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return messages[0]['status'], json.loads(body)
+
+
+def test_asgi_data_endpoints(app, client):
+    asgi_app = AsgiApp(app)
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen'
+
+    async def run_requests():
+        return await asyncio.gather(
+            call_asgi_app(asgi_app, f'{url}/3', b'limit=5'),
+            call_asgi_app(asgi_app, f'{url}/metadata'),
+            call_asgi_app(asgi_app, f'{url}/4'),
+            call_asgi_app(asgi_app, f'{url}/1', b'limit=0'),
+            call_asgi_app(asgi_app, '/health/live'),
+        )
+
+    page, metadata, invalid_level, invalid_limit, health = asyncio.run(run_requests())
+    assert page == (200, client.get(f'{url}/3?limit=5').json)
+    assert metadata == (200, client.get(f'{url}/metadata').json)
+    assert invalid_level == (400, {'status': 'error', 'message': 'Invalid data level'})
+    assert invalid_limit == (400, {'status': 'error', 'message': 'Invalid limit'})
+    assert health[0] == 200  # passed to the Flask app
+
+
+def test_asgi_data_endpoint_compression(app, client):
+    asgi_app = AsgiApp(app)
+    status, headers, body = asyncio.run(asgi_app.handle_request('3.1', '3', b'', 'gzip'))
+    assert status == 200
+    assert (b'content-encoding', b'gzip') in headers
+    assert (b'content-length', str(len(body)).encode()) in headers
+    assert gzip.decompress(body) == client.get('/api/erwerbstaefige/3').data
+
+    # streamed responses are handled by the Flask app
+    assert asyncio.run(asgi_app.handle_request('3.1', '3', b'stream=true')) is None
+
+
+def test_asgi_reads_version_off_event_loop(app, monkeypatch):
+    asgi_app = AsgiApp(app)
+    data_source = app.extensions['data_source']
+    version = type(data_source).version
+    threads = []
+
+    def get_version(self):
+        threads.append(threading.current_thread())
+        return version.fget(self)
+
+    monkeypatch.setattr(type(data_source), 'version', property(get_version))
+    status, _, _ = asyncio.run(asgi_app.handle_request('3.1', '3', b''))
+    assert status == 200
+    # the version may check the Excel file, so it's read in the executor instead of the thread of the event loop
+    assert threads and threading.main_thread() not in threads
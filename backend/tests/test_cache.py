@@ -0,0 +1,31 @@
+import pytest
+
+from app.cache import ResponseCache
+
+
+def test_response_cache_lru_eviction():
+    cache = ResponseCache(max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    assert cache.get('a') == b'1234'  # makes 'b' the least recently used entry
+
+    cache.put('c', b'1234')
+    assert 'b' not in cache
+    assert cache.get('a') == b'1234'
+    assert cache.get('c') == b'1234'
+    assert cache.size == 8
+
+
+def test_response_cache_size_bound():
+    cache = ResponseCache(max_bytes=10)
+    cache.put('a', b'12345678901')
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+    cache.put('a', b'1234')
+    cache.put('a', b'123456')
+    assert cache.size == 6
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,39 @@
+import gzip
+
+import brotli
+import pytest
+import zstandard
+
+from app.compression import Compressor
+
+
+@pytest.mark.parametrize('accept_encoding, encoding', [
+    ('gzip, deflate, br, zstd', 'br'),
+    ('gzip;q=1, br;q=0.5', 'gzip'),
+    ('zstd, gzip', 'zstd'),
+    ('br;q=0, gzip', 'gzip'),
+    ('*', 'br'),
+    ('identity', None),
+    ('', None),
+    (None, None),
+])
+def test_compressor_negotiate(accept_encoding, encoding):
+    assert Compressor().negotiate(accept_encoding) == encoding
+
+
+def test_compressor_compress():
+    compressor = Compressor(min_size=10)
+    body = b'{"Gebietseinheit": "Baden-W\\u00fcrttemberg"}' * 100
+    assert not compressor.should_compress(b'{}')
+    assert compressor.should_compress(body)
+
+    assert gzip.decompress(compressor.compress(body, 'gzip')) == body
+    assert brotli.decompress(compressor.compress(body, 'br')) == body
+    assert zstandard.ZstdDecompressor().decompress(compressor.compress(body, 'zstd')) == body
+    assert len(compressor.compress(body, 'br')) < len(body)
+    with pytest.raises(ValueError):
+        compressor.compress(body, 'deflate')
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -92,6 +92,8 @@ def test_partial_config(partial_config):
     assert validated_config['app']['log_level'] == 'INFO'
     assert validated_config['app']['log_to_console'] == True
     assert validated_config['data_source']['sqlite']['create_tables_from_excel'] == False
+    assert validated_config['data_source']['sqlite']['pool']['size'] == 5
+    assert validated_config['data_source']['sqlite']['pool']['recycle'] == -1
 
 
 def test_invalid_config(invalid_config):
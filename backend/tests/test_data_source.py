@@ -1,10 +1,15 @@
+import asyncio
 import os
+import shutil
 import tempfile
 import time
 
+import numpy as np
+import pandas as pd
 import pytest
 
-from app.data_source import get_data_source, DataLevel
+from app.data_source import get_data_source, DataLevel, ExcelDataSource, Projection
+from app.exceptions import DataNotFoundException, InvalidQueryException
 
 
 def test_excel_data_source(config):
@@ -25,6 +30,117 @@ def test_excel_data_source(config):
             == '1   Bruttoinlandsprodukt in jeweiligen Preisen 1.1   Bruttoinlandsprodukt in Mill. EUR')
 
 
+def test_excel_data_source_cache(config, tmp_path):
+    excel_file = tmp_path / 'data.xlsx'
+    shutil.copy(config['data_source']['excel']['file_name'], excel_file)
+    excel_source = ExcelDataSource(str(excel_file))
+
+    data = excel_source.get_data('1.1', DataLevel.LEVEL3)
+    assert data['NUTS 3'].all()
+    # the parsed sheet and its metadata are served from the cache
+    assert excel_source.get_data('1.1', DataLevel.LEVEL3) is data
+    metadata = excel_source.get_metadata('1.1')
+    assert len(metadata) == ExcelDataSource.metadata_rows
+    assert excel_source.get_metadata('1.1') is metadata
+
+    # touching the file invalidates the cache
+    stat = os.stat(excel_file)
+    os.utime(excel_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reloaded_data = excel_source.get_data('1.1', DataLevel.LEVEL3)
+    assert reloaded_data is not data
+    assert reloaded_data.equals(data)
+
+
+def test_excel_data_source_snapshot(config, tmp_path):
+    excel_file = tmp_path / 'data.xlsx'
+    snapshot_dir = tmp_path / 'snapshots'
+    shutil.copy(config['data_source']['excel']['file_name'], excel_file)
+
+    excel_source = ExcelDataSource(str(excel_file), snapshot_dir=str(snapshot_dir))
+    data = excel_source.get_data('1.1', DataLevel.LEVEL2)
+    metadata = excel_source.get_metadata('1.1')
+    snapshot_path = excel_source._get_snapshot_path('1.1')
+    assert os.path.exists(snapshot_path)
+
+    # a new data source reads the snapshot without opening the Excel file
+    snapshot_source = ExcelDataSource(str(excel_file), snapshot_dir=str(snapshot_dir))
+    snapshot_data = snapshot_source.get_data('1.1', DataLevel.LEVEL2)
+    assert snapshot_source._excel_file is None
+    assert list(snapshot_data.columns) == list(data.columns)
+    assert snapshot_data.to_json(orient='records') == data.to_json(orient='records')
+    assert list(snapshot_source.get_metadata('1.1')) == list(metadata)
+
+    # changing the content of the Excel file rebuilds the snapshot
+    with open(excel_file, 'ab') as file:
+        file.write(b'\0')
+    snapshot_source.get_data('1.1', DataLevel.LEVEL2)
+    assert not os.path.exists(snapshot_path)
+    assert os.path.exists(snapshot_source._get_snapshot_path('1.1'))
+
+
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_excel_data_source_preload(config, use_processes):
+    excel_source = ExcelDataSource(config['data_source']['excel']['file_name'])
+    excel_source.preload(['1.1', '3.1'], use_processes=use_processes, max_workers=2)
+    assert set(excel_source._tables) == {'1.1', '3.1'}
+
+    data = excel_source.get_data('3.1', DataLevel.LEVEL1)
+    assert data['NUTS 1'].all()
+
+
+def test_excel_data_source_columnar_storage(config):
+    dataframe_source = ExcelDataSource(config['data_source']['excel']['file_name'])
+    columnar_source = ExcelDataSource(config['data_source']['excel']['file_name'], storage='columnar')
+
+    requests = [
+        dict(),
+        dict(after=5, limit=4),
+        dict(filters={'Land': 'HE'}),
+        dict(filters={'Regional-schlüssel': '04'}, after=20, limit=2),
+        dict(projection=Projection(['Land'], 2020)),
+    ]
+    for table_name in ['1.1', '3.1']:
+        for data_level in DataLevel:
+            for request in requests:
+                expected = dataframe_source.get_data(table_name, data_level, **request)
+                data = columnar_source.get_data(table_name, data_level, **request)
+                assert list(data.columns) == list(expected.columns)
+                assert data.to_json(orient='records') == expected.to_json(orient='records')
+
+    # the encoded columns are shared and can't be modified
+    table = columnar_source._tables['1.1']
+    partition = table.partitions[DataLevel.LEVEL3]
+    assert not partition.years.flags.writeable
+    assert not table.keys[DataLevel.LEVEL3].flags.writeable
+    codes, values = partition.encoded_columns['Land']
+    assert codes.dtype.itemsize == 1 and not codes.flags.writeable
+
+
+@pytest.mark.parametrize('storage', ['dataframe', 'columnar'])
+def test_excel_data_source_compact_dtypes(config, storage):
+    file_name = config['data_source']['excel']['file_name']
+    object_source = ExcelDataSource(file_name, storage=storage)
+    object_source.compact_dtypes = False
+    compact_source = ExcelDataSource(file_name, storage=storage)
+    float32_source = ExcelDataSource(file_name, storage=storage)
+    float32_source.float_dtype = 'float32'
+
+    for data_level in DataLevel:
+        expected = object_source.get_data('1.1', data_level).drop(columns=['NUTS 1', 'NUTS 2', 'NUTS 3'])
+        data = compact_source.get_data('1.1', data_level).drop(columns=['NUTS 1', 'NUTS 2', 'NUTS 3'])
+        assert data.to_json(orient='records') == expected.to_json(orient='records')
+        data = float32_source.get_data('1.1', data_level, projection=Projection(None, 1994))
+        assert np.allclose(data[list(range(1994, 2022))].to_numpy(dtype=float),
+                           expected[list(range(1994, 2022))].to_numpy(dtype=float), rtol=1e-6)
+
+    report = float32_source.memory_usage('1.1')
+    assert report['bytes'] < object_source.memory_usage('1.1')['bytes']
+    assert report['columns']['2000']['dtype'] == 'float32'
+    # the dataframe storage keeps the year with text values as it is
+    assert report['columns']['1992']['dtype'] == ('object' if storage == 'dataframe' else 'float32')
+    assert float32_source.memory_usage('3.1') is None
+
+
 @pytest.fixture
 def setup_sqlite_db(config):
     config['data_source']['type'] = 'sqlite'
@@ -42,9 +158,10 @@ def setup_sqlite_db(config):
 
         yield
     finally:
-        # Clean up the temporary database file after the test
-        if os.path.exists(db_path):
-            delete_file_with_retry(db_path)
+        # Clean up the temporary database files after the test
+        for path in [db_path, f'{db_path}-wal', f'{db_path}-shm']:
+            if os.path.exists(path):
+                delete_file_with_retry(path)
 
 
 def delete_file_with_retry(file_path, max_retries=5, delay=0.1):
@@ -73,5 +190,223 @@ def test_sqlite_data_source_creation(config, setup_sqlite_db):
         # assert metadata is not None
 
 
+def test_sqlite_data_source_pagination_and_projection(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    excel_source = ExcelDataSource(config['data_source']['sqlite']['excel_file'])
+
+    data = sqlite_source.get_data('1.1', DataLevel.LEVEL3)
+    keys = [int(key) for key in data['Lfd. Nr.']]
+    assert keys == sorted(keys)
+
+    for source in [sqlite_source, excel_source]:
+        page = source.get_data('1.1', DataLevel.LEVEL3, after=keys[4], limit=3)
+        assert [int(key) for key in page['Lfd. Nr.']] == keys[5:8]
+
+        projected_page = source.get_data('1.1', DataLevel.LEVEL3, after=keys[4], limit=3,
+                                         projection=Projection(['Land'], 2020))
+        assert [str(column) for column in projected_page.columns] == ['Lfd. Nr.', 'Land', '2020', '2021']
+
+        filtered_data = source.get_data('1.1', DataLevel.LEVEL3, filters={'Land': 'HE', 'Regional-schlüssel': '042'})
+        assert list(filtered_data['EU-Code']) == [f'DE42{number}' for number in range(1, 6)]
+
+
+def test_sqlite_data_source_import(config, setup_sqlite_db, caplog):
+    caplog.set_level('INFO', logger='app.data_source')
+    sqlite_source = get_data_source(config)
+
+    # every data sheet gets imported, the other sheets (e.g. the title page) are skipped
+    with sqlite_source.engine.connect() as connection:
+        table_names = [row[0] for row in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'import_state' ORDER BY name")]
+    excel_data = ExcelDataSource(config['data_source']['sqlite']['excel_file']).data
+    assert table_names == sorted(sheet_name for sheet_name in excel_data.sheet_names
+                                 if ExcelDataSource.is_data_sheet(excel_data.parse(sheet_name)))
+    assert '1.2' in table_names
+    assert 'rows/s' in caplog.text
+
+
+def test_sqlite_data_source_incremental_import(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    data = sqlite_source.get_data('1.1', DataLevel.LEVEL3)
+
+    # nothing changed since the initial import
+    assert sqlite_source.create_tables_from_excel_file() == []
+
+    # only the sheet whose hash differs gets imported again and the data stays available
+    with sqlite_source.engine.connect() as connection:
+        with pytest.raises(Exception, match='readonly'):
+            connection.exec_driver_sql("UPDATE import_state SET content_hash = 'outdated' WHERE sheet_name = '1.1'")
+    engine = sqlite_source.create_write_engine()
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE import_state SET content_hash = 'outdated' WHERE sheet_name = '1.1'")
+        connection.exec_driver_sql("INSERT INTO import_state (sheet_name, content_hash) VALUES ('removed', 'hash')")
+        connection.exec_driver_sql('CREATE TABLE "removed" (id INTEGER)')
+    engine.dispose()
+    assert sqlite_source.create_tables_from_excel_file() == ['1.1']
+    assert sqlite_source.get_data('1.1', DataLevel.LEVEL3).equals(data)
+
+    # tables of the removed sheets are dropped
+    with sqlite_source.engine.connect() as connection:
+        table_names = [row[0] for row in connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert 'removed' not in table_names
+    assert not any(table_name.endswith('__staging') for table_name in table_names)
+
+    assert sorted(sqlite_source.create_tables_from_excel_file(force=True)) == ['1.1', '1.2', '3.1']
+
+
+def test_async_data_sources(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    excel_source = ExcelDataSource(config['data_source']['sqlite']['excel_file'])
+    projection = Projection(['Land'], 2020)
+
+    async def get_pages():
+        pages = await asyncio.gather(*[
+            source.aget_data('1.1', DataLevel.LEVEL3, after=5, limit=3, projection=projection)
+            for source in [sqlite_source, excel_source]])
+        await sqlite_source.async_engine.dispose()
+        return pages
+
+    for source, page in zip([sqlite_source, excel_source], asyncio.run(get_pages())):
+        assert page.equals(source.get_data('1.1', DataLevel.LEVEL3, after=5, limit=3, projection=projection))
+    assert asyncio.run(excel_source.aget_metadata('1.1')).equals(excel_source.get_metadata('1.1'))
+
+
+def test_iter_data(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    excel_source = ExcelDataSource(config['data_source']['sqlite']['excel_file'])
+
+    for source in [sqlite_source, excel_source]:
+        data = source.get_data('1.1', DataLevel.LEVEL3, after=5, filters={'Land': 'BA'})
+        chunks = list(source.iter_data('1.1', DataLevel.LEVEL3, chunk_size=3, after=5, filters={'Land': 'BA'}))
+        assert [len(chunk) for chunk in chunks[:-1]] == [3] * (len(chunks) - 1)
+        assert 0 < len(chunks[-1]) <= 3 and len(chunks) > 1
+        assert pd.concat(chunks).to_json(orient='records') == data.to_json(orient='records')
+
+        # the first chunk is yielded even if nothing matches, so the columns are known
+        empty_chunks = list(source.iter_data('1.1', DataLevel.LEVEL3, filters={'Land': 'XX'}))
+        assert len(empty_chunks) == 1 and empty_chunks[0].empty
+        assert list(empty_chunks[0].columns) == list(data.columns)
+
+
+def test_get_series(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    excel_file = config['data_source']['sqlite']['excel_file']
+    keys = ['DE11', 'XX', 'DE2', 'DE1', 'DE111', 'DE12', 'DE11']
+
+    expected = pd.concat([sqlite_source.get_data('1.1', DataLevel(code), filters={'EU-Code': key})
+                          for code, key in [('2', 'DE11'), ('1', 'DE2'), ('1', 'DE1'), ('3', 'DE111'), ('2', 'DE12')]],
+                         ignore_index=True)
+    for source in [sqlite_source, ExcelDataSource(excel_file), ExcelDataSource(excel_file, storage='columnar')]:
+        data = source.get_series('1.1', keys)
+        assert list(data['EU-Code']) == ['DE11', 'DE2', 'DE1', 'DE111', 'DE12']
+        assert data.to_json(orient='values') == expected.to_json(orient='values')
+
+        projected_data = source.get_series('1.1', ['02', '01'], 'Regional-schlüssel', first_year=2020)
+        assert list(projected_data['EU-Code']) == ['DE2', 'DE1']
+        assert [str(column) for column in projected_data.columns if str(column).isdigit()] == ['2020', '2021']
+
+        assert source.get_series('1.1', ['XX']).empty
+        with pytest.raises(InvalidQueryException):
+            source.get_series('1.1', ['BA'], 'Land')
+
+    # the index maps the regions of all the levels to their positions
+    table = ExcelDataSource(excel_file)._get_table('1.1')
+    assert table.series_indexes['EU-Code']['DE111'][0] == DataLevel.LEVEL3
+
+
+@pytest.mark.parametrize('operation', ['sum', 'mean', 'min', 'max', 'growth'])
+def test_aggregate(config, setup_sqlite_db, operation):
+    sqlite_source = get_data_source(config)
+    excel_source = ExcelDataSource(config['data_source']['sqlite']['excel_file'])
+
+    for group, filters in [('Land', None), (None, None), (None, {'Land': 'HE'})]:
+        expected = excel_source.aggregate('1.1', DataLevel.LEVEL3, operation, group, 2015, 2021, filters)
+        data = sqlite_source.aggregate('1.1', DataLevel.LEVEL3, operation, group, 2015, 2021, filters)
+        expected.columns = [str(column) for column in expected.columns]
+        pd.testing.assert_frame_equal(data, expected, check_names=False, check_dtype=False)
+        assert len(data) == (3 if group else 1)
+
+    # the aggregates match the ones computed from the raw data
+    data = excel_source.get_data('1.1', DataLevel.LEVEL3, filters={'Land': 'HE'})
+    values = pd.to_numeric(data[2020], errors='coerce')
+    aggregates = sqlite_source.aggregate('1.1', DataLevel.LEVEL3, operation, 'Land', 2019, 2020)
+    aggregate = aggregates[aggregates['Land'] == 'HE']['2020'].iloc[0]
+    if operation == 'growth':
+        assert aggregate == pytest.approx(values.sum() / pd.to_numeric(data[2019], errors='coerce').sum() - 1)
+    else:
+        assert aggregate == pytest.approx(getattr(values, operation)())
+
+
+def test_aggregate_invalid(config):
+    excel_source = ExcelDataSource(config['data_source']['excel']['file_name'])
+    with pytest.raises(InvalidQueryException):
+        excel_source.aggregate('1.1', DataLevel.LEVEL3, 'median')
+    with pytest.raises(InvalidQueryException):
+        excel_source.aggregate('1.1', DataLevel.LEVEL3, 'sum', 'EU-Code')
+
+
+def test_sqlite_data_source_table_cache(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    sqlite_source.get_data('1.1', DataLevel.LEVEL1)
+    table = sqlite_source._tables['1.1']
+    sqlite_source.get_data('1.1', DataLevel.LEVEL2)
+    assert sqlite_source._tables['1.1'] is table
+
+    # changing the schema invalidates the cached tables
+    engine = sqlite_source.create_write_engine()
+    with engine.begin() as connection:
+        connection.exec_driver_sql('CREATE TABLE "schema_change" (id INTEGER)')
+    engine.dispose()
+    sqlite_source.get_data('1.1', DataLevel.LEVEL1)
+    assert sqlite_source._tables['1.1'] is not table
+
+
+def test_sqlite_data_source_schema(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    sqlite_source.get_data('1.1', DataLevel.LEVEL1)
+
+    with sqlite_source.engine.connect() as connection:
+        columns = {row[1]: row[2] for row in connection.exec_driver_sql('PRAGMA table_info("1.1")')}
+        assert columns['Lfd. Nr.'] == 'INTEGER'
+        assert columns['2020'] == 'FLOAT'
+        assert columns['NUTS 3'] == 'VARCHAR'
+        assert sqlite_source.get_columns('1.1') == list(columns)
+        assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+
+        # level queries are answered by the NUTS index instead of a table scan
+        query = sqlite_source.build_data_query(sqlite_source.get_table('1.1', connection), DataLevel.LEVEL3, limit=5)
+        compiled_query = query.compile(connection, compile_kwargs={'literal_binds': True})
+        plan = ' '.join(row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled_query}'))
+        assert 'ix_1.1_NUTS 3' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    # the serving connections are read-only
+    with pytest.raises(DataNotFoundException):
+        sqlite_source.get_data('missing', DataLevel.LEVEL1)
+    with pytest.raises(DataNotFoundException):
+        sqlite_source.get_columns('missing')
+    with sqlite_source.engine.connect() as connection:
+        with pytest.raises(Exception, match='readonly'):
+            connection.exec_driver_sql('CREATE TABLE "not_allowed" (id INTEGER)')
+
+
+def test_sqlite_data_source_text_values(config, setup_sqlite_db):
+    sqlite_source = get_data_source(config)
+    excel_source = ExcelDataSource(config['data_source']['sqlite']['excel_file'])
+
+    # both sources serve the same response for a row with a '.' (missing value) cell
+    filters = {'EU-Code': 'DE122'}
+    data = sqlite_source.get_data('1.1', DataLevel.LEVEL3, filters=filters)
+    expected = excel_source.get_data('1.1', DataLevel.LEVEL3, filters=filters)
+    assert data['1992'].tolist() == ['.']
+    assert data.to_json(orient='records') == expected.to_json(orient='records')
+
+    # the text values are ignored by the aggregates
+    for operation in ['sum', 'mean', 'max']:
+        aggregate = sqlite_source.aggregate('1.1', DataLevel.LEVEL3, operation, 'Land', 1992, 1992)
+        expected_aggregate = excel_source.aggregate('1.1', DataLevel.LEVEL3, operation, 'Land', 1992, 1992)
+        assert np.allclose(aggregate['1992'], expected_aggregate[1992])
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -0,0 +1,22 @@
+import sqlite3
+
+import yaml
+
+from app.importer import main
+
+
+def test_importer(config, tmp_path, caplog):
+    db_path = tmp_path / 'imported.db'
+    config['data_source']['sqlite']['db_path'] = str(db_path)
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text(yaml.safe_dump(config))
+
+    main(['--config', str(config_file)])
+    with sqlite3.connect(db_path) as connection:
+        imported_sheets = [row[0] for row in connection.execute('SELECT sheet_name FROM import_state ORDER BY 1')]
+    assert imported_sheets == ['1.1', '1.2', '3.1']
+
+    # unchanged sheets are not imported again
+    caplog.set_level('INFO', logger='app')
+    main(['--config', str(config_file)])
+    assert 'Imported 0 sheets' in caplog.text
@@ -1,5 +1,15 @@
+import gzip
+import io
+import json
+
+import brotli
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet
 import pytest
 
+from app.routes import DATA_TABLES
+
 
 def test_data_endpoint_valid(client):
     response = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/1')
@@ -8,6 +18,278 @@ def test_data_endpoint_valid(client):
     assert response.json['status'] == 'success'
 
 
+def test_data_endpoint_payload(client):
+    response = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/1')
+    records = response.json['data']
+    assert isinstance(records, list)
+    assert 'NUTS 1' not in records[0]
+
+    legacy_response = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/1?payload=string')
+    assert legacy_response.status_code == 200
+    assert json.loads(legacy_response.json['data']) == records
+
+    response = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/1?payload=xml')
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid payload'
+
+
+def test_data_endpoint_pagination(client):
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen/3'
+    records = client.get(url).json['data']
+
+    paginated_records = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(f'{url}?limit=7&cursor={cursor}')
+        assert response.status_code == 200
+        assert len(response.json['data']) <= 7
+        paginated_records += response.json['data']
+        cursor = response.json['next_cursor']
+    assert paginated_records == records
+
+    response = client.get(f'{url}?limit=0')
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid limit'
+
+    response = client.get(f'{url}?cursor=invalid')
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid cursor'
+
+
+def test_data_endpoint_projection(client):
+    url = '/api/erwerbstaefige/2'
+    response = client.get(f'{url}?columns=EU-Code,Gebietseinheit&years=2015..2021')
+    assert response.status_code == 200
+    assert list(response.json['data'][0]) == ['Lfd. Nr.', 'EU-Code', 'Gebietseinheit'] + [str(year) for year in
+                                                                                          range(2015, 2022)]
+
+    response = client.get(f'{url}?years=..1995')
+    assert response.status_code == 200
+    assert [column for column in response.json['data'][0] if column.isdigit()] == ['1992', '1994', '1995']
+
+    response = client.get(f'{url}?columns=Unknown')
+    assert response.status_code == 400
+    assert response.json['message'] == 'Unknown columns: Unknown'
+
+    response = client.get(f'{url}?years=2015-2021')
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid years'
+
+
+def test_data_endpoint_filters(client):
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen/3'
+    records = client.get(url).json['data']
+
+    response = client.get(f'{url}?land=BA')
+    assert response.json['data'] == [record for record in records if record['Land'] == 'BA']
+
+    response = client.get(f'{url}?eu_code=DE213')
+    assert [record['EU-Code'] for record in response.json['data']] == ['DE213']
+
+    response = client.get(f'{url}?regionalschluessel=012&land=BA&limit=3')
+    expected_records = [record for record in records if record['Regional-schlüssel'].startswith('012')]
+    assert response.json['data'] == expected_records[:3]
+    response = client.get(f'{url}?regionalschluessel=012&land=BA&limit=3&cursor={response.json["next_cursor"]}')
+    assert response.json['data'] == expected_records[3:]
+
+    response = client.get(f'{url}?land=XX')
+    assert response.status_code == 200
+    assert response.json['data'] == []
+
+
+def test_data_endpoint_cached(app, client):
+    response_cache = app.extensions['response_cache']
+    response = client.get('/api/erwerbstaefige/2')
+    assert response.status_code == 200
+    hits = response_cache.hits
+
+    cached_response = client.get('/api/erwerbstaefige/2')
+    assert cached_response.status_code == 200
+    assert response_cache.hits == hits + 1
+    assert cached_response.data == response.data
+
+
+def test_data_endpoint_compression(app, client):
+    response_cache = app.extensions['response_cache']
+    response = client.get('/api/erwerbstaefige/3')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    for encoding, decompress in [('gzip', gzip.decompress), ('br', brotli.decompress)]:
+        compressed_response = client.get('/api/erwerbstaefige/3', headers={'Accept-Encoding': encoding})
+        assert compressed_response.headers['Content-Encoding'] == encoding
+        assert len(compressed_response.data) < len(response.data)
+        assert decompress(compressed_response.data) == response.data
+
+        # the compressed variant is cached and served without compressing the body again
+        hits = response_cache.hits
+        cached_response = client.get('/api/erwerbstaefige/3', headers={'Accept-Encoding': encoding})
+        assert response_cache.hits == hits + 1
+        assert cached_response.data == compressed_response.data
+
+    # small responses are not compressed
+    small_response = client.get('/api/erwerbstaefige/3?limit=1&columns=Land&years=2020',
+                                headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small_response.headers
+
+
+def test_data_endpoint_formats(client):
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen/3'
+    records = client.get(url).json['data']
+
+    arrow_response = client.get(url, headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    assert arrow_response.mimetype == 'application/vnd.apache.arrow.stream'
+    table = pa.ipc.open_stream(arrow_response.data).read_all()
+    assert table.schema.field('2020').type == pa.float64()
+    assert table.schema.field('Lfd. Nr.').type == pa.int64()
+    assert table.num_rows == len(records)
+    assert table.column('EU-Code').to_pylist() == [record['EU-Code'] for record in records]
+
+    parquet_response = client.get(f'{url}?format=parquet', headers={'Accept-Encoding': 'gzip'})
+    assert parquet_response.mimetype == 'application/vnd.apache.parquet'
+    assert 'Content-Encoding' not in parquet_response.headers  # already compressed
+    assert pa.parquet.read_table(io.BytesIO(parquet_response.data)).equals(table)
+
+    csv_response = client.get(f'{url}?format=csv')
+    assert csv_response.mimetype == 'text/csv'
+    assert len(pd.read_csv(io.BytesIO(csv_response.data))) == len(records)
+
+    # browsers accept anything, so they still get JSON
+    assert client.get(url, headers={'Accept': 'text/html,*/*;q=0.8'}).mimetype == 'application/json'
+    assert client.get(f'{url}?format=xml').json == {'status': 'error', 'message': 'Invalid format'}
+    assert client.get(f'{url}?format=csv&limit=5').status_code == 400
+
+
+def test_data_endpoint_formats_pagination(client):
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen/3?format=arrow&limit=5'
+    page = pa.ipc.open_stream(client.get(url).data).read_all()
+    assert page.num_rows == 5
+    cursor = page.schema.metadata[b'next_cursor'].decode()
+    assert cursor == client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/3?limit=5').json['next_cursor']
+
+    next_page = pa.ipc.open_stream(client.get(f'{url}&cursor={cursor}').data).read_all()
+    assert next_page.column('Lfd. Nr.')[0].as_py() > page.column('Lfd. Nr.')[-1].as_py()
+
+
+def test_data_endpoint_stream(app, client):
+    app.config['stream_chunk_size'] = 50
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen/3'
+    records = client.get(url).json['data']
+
+    response = client.get(f'{url}?stream=true')
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.data.splitlines()] == records
+    assert client.get(url, headers={'Accept': 'application/x-ndjson'}).data == response.data
+
+    csv_response = client.get(f'{url}?format=csv&stream=true')
+    assert csv_response.is_streamed
+    assert csv_response.data == client.get(f'{url}?format=csv').data
+
+    arrow_response = client.get(f'{url}?format=arrow&stream=true')
+    assert arrow_response.is_streamed
+    table = pa.ipc.open_stream(arrow_response.data).read_all()
+    assert table.equals(pa.ipc.open_stream(client.get(f'{url}?format=arrow').data).read_all())
+
+    assert client.get(f'{url}?format=parquet&stream=true').json == {
+        'status': 'error', 'message': 'Streaming is not supported by the parquet format'}
+    assert client.get(f'{url}?stream=true&limit=5').status_code == 400
+    assert client.get(f'{url}?stream=yes').status_code == 400
+    assert client.get(f'{url}?stream=true&columns=Unknown').status_code == 400
+
+
+def test_aggregate_endpoint(app, client):
+    url = '/api/erwerbstaefige/3/aggregate'
+    response = client.get(f'{url}?op=mean&group=Land&years=2019..2021')
+    assert response.status_code == 200
+    assert response.json['op'] == 'mean' and response.json['group'] == 'Land'
+    assert [record['Land'] for record in response.json['data']] == ['BA', 'BE', 'HE']
+    assert set(response.json['data'][0]) == {'Land', '2019', '2020', '2021'}
+
+    # the responses are memoized per set of parameters
+    response_cache = app.extensions['response_cache']
+    hits = response_cache.hits
+    assert client.get(f'{url}?op=mean&group=Land&years=2019..2021').data == response.data
+    assert response_cache.hits == hits + 1
+
+    total = client.get(f'{url}?years=2020&land=HE').json['data']
+    assert total == [{'2020': pytest.approx(sum(record['2020'] for record in client.get(
+        '/api/erwerbstaefige/3?land=HE').json['data'] if isinstance(record['2020'], float)))}]
+    record = client.get('/api/erwerbstaefige/3?eu_code=DE111&years=2020').json['data'][0]
+    assert client.get(f'{url}?years=2020&eu_code=DE111').json['data'] == [{'2020': pytest.approx(record['2020'])}]
+
+    assert client.get(f'{url}?op=median').json == {'status': 'error', 'message': 'Invalid op'}
+    assert client.get(f'{url}?group=Gebietseinheit').json == {'status': 'error', 'message': 'Invalid group'}
+    assert client.get('/api/erwerbstaefige/4/aggregate').status_code == 400
+
+
+def test_series_endpoint(client):
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen/series'
+    response = client.get(f'{url}/DE11,XX,DE1,DE2')
+    assert response.status_code == 200
+    assert [record['EU-Code'] for record in response.json['data']] == ['DE11', 'DE1', 'DE2']
+    assert response.json['missing'] == ['XX']
+    assert 'NUTS 2' not in response.json['data'][0]
+    level_record = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/2?eu_code=DE11').json['data'][0]
+    assert response.json['data'][0] == level_record
+    other_level_record = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/1?eu_code=DE2').json['data'][0]
+    assert response.json['data'][2] == other_level_record
+
+    compact = client.get(f'{url}/011,02,012?key=regionalschluessel&compact=true&years=2020..').json
+    assert compact['regions'] == ['011', '02', '012'] and compact['years'] == [2020, 2021]
+    assert compact['values'][0] == [level_record['2020'], level_record['2021']]
+    other_record = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/2?eu_code=DE12').json['data'][0]
+    assert compact['values'][2] == [other_record['2020'], other_record['2021']]
+
+    assert client.get(f'{url}/XX').status_code == 404
+    assert client.get(f'{url}/DE1?key=land').json == {'status': 'error', 'message': 'Invalid key'}
+
+
+def test_batch_endpoint(app, client, monkeypatch):
+    data_source = app.extensions['data_source']
+    calls = []
+    get_data = data_source.get_data
+    monkeypatch.setattr(data_source, 'get_data', lambda *args, **kwargs: calls.append(args) or get_data(*args, **kwargs))
+    app.extensions['response_cache'].clear()
+
+    url = '/api/bruftoinlandsprodukt_in_jeweiligen_preisen'
+    response = client.post('/api/batch', json={'requests': [
+        {'resource': 'Bruftoinlandsprodukt_in_jeweiligen_Preisen', 'level': 3, 'options': {'limit': 5}},
+        {'resource': 'erwerbstaefige', 'level': 'metadata'},
+        {'resource': 'bruftoinlandsprodukt_in_jeweiligen_preisen', 'level': '3', 'options': {'limit': '5'}},
+        {'resource': 'erwerbstaefige', 'level': '4'},
+        {'resource': 'unknown', 'level': '1'},
+        {'resource': 'erwerbstaefige', 'level': '1', 'options': {'format': 'csv'}},
+    ]})
+    assert response.status_code == 200
+    results = response.json['results']
+    assert results[0] == results[2] == {'status': 200, 'body': client.get(f'{url}/3?limit=5').json}
+    assert results[1] == {'status': 200, 'body': client.get('/api/erwerbstaefige/metadata').json}
+    assert results[3] == {'status': 400, 'body': {'status': 'error', 'message': 'Invalid data level'}}
+    assert results[4]['status'] == 404
+    assert results[5]['status'] == 400
+    # identical requests are only run once
+    assert len(calls) == 1
+
+    # JSON options are passed like query string parameters, null options are omitted
+    response = client.post('/api/batch', json={'requests': [
+        {'resource': 'erwerbstaefige', 'level': '1', 'options': {'stream': False, 'limit': 2, 'cursor': None}},
+        {'resource': 'erwerbstaefige', 'level': '1', 'options': {'stream': True}},
+    ]})
+    results = response.json['results']
+    assert results[0] == {'status': 200, 'body': client.get('/api/erwerbstaefige/1?stream=false&limit=2').json}
+    assert results[1]['status'] == 400
+    response = client.post('/api/batch', json={'requests': [
+        {'resource': 'erwerbstaefige', 'level': '1', 'options': {'limit': [2]}}]})
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid request, option limit must be a string, number or boolean'
+
+    assert client.post('/api/batch', json={'requests': {}}).status_code == 400
+    assert client.post('/api/batch', json={'requests': [{'level': '1'}]}).status_code == 400
+    assert client.post('/api/batch', json={'requests': [{'resource': 'erwerbstaefige', 'level': '1'}] * 101}).json == {
+        'status': 'error', 'message': 'Too many requests, at most 100 are allowed'}
+
+
 def test_data_endpoint_invalid(client):
     response = client.get('/api/bruftoinlandsprodukt_in_jeweiligen_preisen/4')
     assert response.status_code == 400
@@ -22,6 +304,31 @@ def test_metadata_endpoint(client):
     assert response.json['status'] == 'success'
 
 
+def test_swagger_spec(app, client, monkeypatch):
+    response = client.get('/api/spec')
+    assert response.status_code == 200
+    assert response.json['info']['title'] == 'Data API'
+
+    # the schemas of the records are generated from the columns of the tables
+    paths = response.json['paths']
+    for resource_name, table_name in DATA_TABLES.items():
+        columns = app.extensions['data_source'].get_columns(table_name)
+        properties = paths[f'/api/{resource_name.lower()}/{{data_level}}']['get']['responses']['200']['schema'][
+            'properties']['data']['items']['properties']
+        assert list(properties) == [str(column) for column in columns if not str(column).startswith('NUTS')]
+        assert properties['Lfd. Nr.']['type'] == 'integer' and properties['2021']['type'] == 'number'
+        series = paths[f'/api/{resource_name.lower()}/series/{{keys}}']['get']['responses']['200']
+        assert series['schema']['properties']['data']['items']['properties'] == properties
+        aggregate = paths[f'/api/{resource_name.lower()}/{{data_level}}/aggregate']['get']['responses']['200']
+        assert 'Land' in aggregate['schema']['properties']['data']['items']['properties']
+    aggregate_parameters = paths['/api/erwerbstaefige/{data_level}/aggregate']['get']['parameters']
+    assert {'land', 'eu_code', 'regionalschluessel'} <= {parameter['name'] for parameter in aggregate_parameters}
+
+    # the spec is only built once
+    monkeypatch.setattr('app.api_spec.swagger', lambda app: pytest.fail('The spec was built again'))
+    assert client.get('/api/spec').data == response.data
+
+
 def test_home_route(client):
     response = client.get('/')
     assert response.status_code == 200
@@ -31,5 +338,49 @@ def test_home_route(client):
     assert b'erwerbstaefige' in response.data
 
 
+def test_endpoints_directory(app, client):
+    response = client.get('/endpoints')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    directory = response.json
+    assert response.headers['ETag'] == f'"{directory["version"]}"'
+    assert directory['endpoints']['erwerbstaefige'] == {
+        'data': {'1': '/api/erwerbstaefige/1', '2': '/api/erwerbstaefige/2', '3': '/api/erwerbstaefige/3'},
+        'metadata': '/api/erwerbstaefige/metadata',
+    }
+    assert set(directory['endpoints']) == {resource_name.lower() for resource_name in DATA_TABLES}
+    assert directory['api_spec'] == '/api/spec'
+
+    # clients revalidate their cached directory with its version
+    response = client.get('/endpoints', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert client.get('/endpoints', headers={'If-None-Match': '"outdated"'}).status_code == 200
+
+    # the home page uses the same precomputed directory with absolute urls
+    assert b'http://localhost/api/erwerbstaefige/3' in client.get('/').data
+
+
+def test_health_endpoints(client):
+    response = client.get('/health/live')
+    assert response.status_code == 200
+    assert response.json['status'] == 'alive'
+
+    response = client.get('/health/ready')
+    assert response.status_code == 200
+    assert response.json['status'] == 'ready'
+
+
+def test_memory_endpoint(client):
+    response = client.get('/health/memory')
+    assert response.status_code == 200
+    tables = response.json['tables']
+    assert set(tables) == {'1.1', '3.1'}
+    assert response.json['bytes'] == sum(table['bytes'] for table in tables.values())
+    columns = tables['1.1']['columns']
+    assert columns['Lfd. Nr.']['dtype'] == 'int64'
+    assert columns['Land']['dtype'] == 'category'
+    assert columns['NUTS 1'] == {'dtype': 'bool', 'bytes': tables['1.1']['rows']}
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -0,0 +1,43 @@
+import gc
+import os
+
+from app.server import PreforkServer, get_server_options, serve
+
+
+def test_server_options(config):
+    options = get_server_options(config['server'])
+    assert options['workers'] == os.cpu_count()
+    assert options['bind'] == '0.0.0.0:5000'
+
+    config['server']['workers'] = 3
+    assert get_server_options(config['server'])['workers'] == 3
+
+
+def test_prefork_server(app, config):
+    server = PreforkServer(app, get_server_options(config['server']))
+    assert server.load() is app
+    assert server.cfg.preload_app
+    assert server.cfg.workers == os.cpu_count()
+
+    # the workers reset the state that can't be shared with the master
+    data_source = app.extensions['data_source']
+    batch_handler = app.extensions['batch_handler']
+    executor, batch_executor = data_source.async_executor, batch_handler.executor
+    server.cfg.post_fork(None, None)
+    assert data_source.async_executor is not executor
+    assert batch_handler.executor is not batch_executor
+
+
+def test_serve_collects_garbage_in_master(monkeypatch):
+    states = []
+    monkeypatch.setattr(PreforkServer, 'run', lambda self: states.append((gc.isenabled(), gc.get_freeze_count())))
+    try:
+        serve('test_config.yaml')
+    finally:
+        gc.unfreeze()
+        gc.enable()
+
+    # the loaded objects are frozen but the master keeps collecting its own garbage
+    enabled, freeze_count = states[0]
+    assert enabled
+    assert freeze_count > 0
@@ -20,8 +20,9 @@ function Tablee() {
       .get(`http://127.0.0.1:5000/api/${table}/${level}`)
       .then((response) => {
         if (response.data.status === "success") {
-          const parsedData = JSON.parse(response.data.data);
-          setData(parsedData);
+          // older backends send the records as a JSON string instead of an array
+          const records = response.data.data;
+          setData(typeof records === "string" ? JSON.parse(records) : records);
         }
       })
       .catch((error) => {